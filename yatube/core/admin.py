@@ -0,0 +1,28 @@
+from django.contrib import admin
+
+from yatube.settings import EMPTY_CONST
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'status',
+        'attempts',
+        'run_at',
+        'finished',
+    )
+    list_filter = ('status', 'name')
+    readonly_fields = ('last_error',)
+    actions = ('retry',)
+    empty_value_display = EMPTY_CONST
+
+    def retry(self, request, queryset):
+        updated = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.PENDING, attempts=0, finished=None
+        )
+        self.message_user(request, f'Возвращено в очередь: {updated}')
+    retry.short_description = 'Повторить выбранные задачи'
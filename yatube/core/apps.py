@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.utils.module_loading import autodiscover_modules
 
 
 class CoreConfig(AppConfig):
     name = 'core'
     verbose_name = 'Служебное приложение'
+
+    def ready(self):
+        from . import instrumentation, metrics
+        from .db import apply_sqlite_pragmas
+        from .signals import cache_read, request_measured
+
+        autodiscover_modules('tasks')
+        connection_created.connect(apply_sqlite_pragmas)
+        connection_created.connect(metrics.count_connection)
+        cache_read.connect(instrumentation.record_cache)
+        cache_read.connect(metrics.cache_lookups)
+        request_measured.connect(metrics.record_request)
@@ -0,0 +1,258 @@
+"""Кэш в файле SQLite, общий для всех процессов одного сервера.
+
+В отличие от LocMemCache записи видны всем воркерам и переживают
+перезапуск, а в отличие от memcached/Redis не нужен отдельный сервис.
+Размер ограничен числом записей (OPTIONS['MAX_ENTRIES']) и объёмом
+(OPTIONS['MAX_SIZE'], байт); при превышении удаляются просроченные
+записи, а затем давно не читавшиеся (LRU). Число записей и их объём
+ведут триггеры в строке cache_stats, чтобы запись не считала их по всей
+таблице.
+"""
+import os
+import pickle
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .db import local_sqlite
+from .signals import cache_read
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS cache_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    entries INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_stats
+    SELECT 1, COUNT(*), TOTAL(size) FROM cache;
+CREATE TRIGGER IF NOT EXISTS cache_stats_insert AFTER INSERT ON cache
+BEGIN
+    UPDATE cache_stats SET entries = entries + 1, size = size + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_stats_delete AFTER DELETE ON cache
+BEGIN
+    UPDATE cache_stats SET entries = entries - 1, size = size - OLD.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_stats_update
+AFTER UPDATE OF size ON cache
+BEGIN
+    UPDATE cache_stats SET size = size - OLD.size + NEW.size;
+END;
+COMMIT;
+"""
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        # Имя кэша в метриках — имя файла без расширения
+        self._name = os.path.splitext(os.path.basename(location))[0]
+        options = params.get('OPTIONS', {})
+        self._max_size = int(options.get('MAX_SIZE', 0))
+        # Время чтения обновляется не чаще раза в столько секунд,
+        # чтобы чтения не превращались в запись на каждый запрос
+        self._access_precision = float(options.get('ACCESS_PRECISION', 10))
+        self._timeout_ms = int(float(options.get('BUSY_TIMEOUT', 5)) * 1000)
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        return local_sqlite(
+            self._local, self._path, SCHEMA, self._timeout_ms / 1000
+        )
+
+    def get_backend_timeout(self, timeout=DEFAULT_TIMEOUT):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return time.time() + timeout
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._store(key, value, timeout, replace=False)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._get_many([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        made = {self.make_key(key, version=version): key for key in keys}
+        for key in made:
+            self.validate_key(key)
+        values = self._get_many(list(made))
+        return {made[key]: value for key, value in values.items()}
+
+    def _get_many(self, keys):
+        if not keys:
+            return {}
+        now = time.time()
+        placeholders = ', '.join('?' * len(keys))
+        rows = self._db.execute(
+            f'SELECT key, value, expires, accessed FROM cache '
+            f'WHERE key IN ({placeholders})',
+            keys,
+        ).fetchall()
+        values = {}
+        stale = []
+        for key, value, expires, accessed in rows:
+            if expires is not None and expires <= now:
+                continue
+            values[key] = pickle.loads(value)
+            if accessed < now - self._access_precision:
+                stale.append(key)
+        if stale:
+            placeholders = ', '.join('?' * len(stale))
+            self._db.execute(
+                f'UPDATE cache SET accessed = ? WHERE key IN ({placeholders})',
+                [now] + stale,
+            )
+        cache_read.send(
+            sender=self.__class__, name=self._name,
+            hits=len(values), misses=len(keys) - len(values),
+        )
+        return values
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._store(key, value, timeout, replace=True)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        for key, value in data.items():
+            self.set(key, value, timeout, version=version)
+        return []
+
+    def _store(self, key, value, timeout, replace):
+        expires = self.get_backend_timeout(timeout)
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            if not replace:
+                row = db.execute(
+                    'SELECT expires FROM cache WHERE key = ?', (key,)
+                ).fetchone()
+                if row is not None and (row[0] is None or row[0] > now):
+                    db.execute('COMMIT')
+                    return False
+            # REPLACE удалил бы строку без триггера удаления, поэтому
+            # замена записывается через UPDATE
+            db.execute(
+                'INSERT INTO cache (key, value, expires, accessed, size) '
+                'VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+                'value = excluded.value, expires = excluded.expires, '
+                'accessed = excluded.accessed, size = excluded.size',
+                (key, data, expires, now, len(data)),
+            )
+            self._cull(db, now)
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        return True
+
+    def _stats(self, db):
+        return db.execute(
+            'SELECT entries, size FROM cache_stats'
+        ).fetchone()
+
+    def _cull(self, db, now):
+        entries, size = self._stats(db)
+        over_entries = entries > self._max_entries
+        over_size = self._max_size and size > self._max_size
+        if not over_entries and not over_size:
+            return
+        db.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        entries, size = self._stats(db)
+        if entries > self._max_entries:
+            if self._cull_frequency == 0:
+                db.execute('DELETE FROM cache')
+                return
+            self._delete_oldest(db, max(entries // self._cull_frequency, 1))
+        while self._max_size and size > self._max_size:
+            self._delete_oldest(db, max(entries // 10, 1))
+            entries, size = self._stats(db)
+
+    def _delete_oldest(self, db, count):
+        db.execute(
+            'DELETE FROM cache WHERE key IN '
+            '(SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            (count,),
+        )
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        cursor = self._db.execute(
+            'UPDATE cache SET expires = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time()),
+        )
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._db.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version=version) for key in keys]
+        for key in keys:
+            self.validate_key(key)
+        if keys:
+            placeholders = ', '.join('?' * len(keys))
+            self._db.execute(
+                f'DELETE FROM cache WHERE key IN ({placeholders})', keys
+            )
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return bool(self._get_many([key]))
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= time.time()):
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            db.execute(
+                'UPDATE cache SET value = ?, size = ? WHERE key = ?',
+                (data, len(data), key),
+            )
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        return value
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединение живёт весь поток: открывать файл на каждый запрос
+        # дороже, чем держать его открытым
+        pass
@@ -0,0 +1,73 @@
+"""Настройка соединений с базой данных и оценки по её статистике."""
+import os
+import sqlite3
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Выполняет прагмы settings.SQLITE_PRAGMAS в новом соединении SQLite.
+
+    Подключается к сигналу connection_created в CoreConfig.ready().
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def local_sqlite(local, path, schema, timeout=5):
+    """Соединение со служебным файлом SQLite вне баз Django.
+
+    Соединение своё у каждого потока (local — threading.local()
+    владельца) и процесса: после fork соединение родителя использовать
+    нельзя. При открытии включается WAL и создаётся схема schema.
+    """
+    if (
+        getattr(local, 'pid', None) != os.getpid()
+        or getattr(local, 'path', None) != path
+    ):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None,
+            check_same_thread=False,
+        )
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        db.executescript(schema)
+        local.db = db
+        local.pid = os.getpid()
+        local.path = path
+    return local.db
+
+
+def estimated_count(model, using='default'):
+    """Примерное число строк таблицы модели из статистики планировщика.
+
+    PostgreSQL хранит его в pg_class.reltuples, SQLite — в sqlite_stat1
+    после ANALYZE. Если статистики нет, возвращается None.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples FROM pg_class WHERE relname = %s'
+    elif connection.vendor == 'sqlite':
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        # Таблицы sqlite_stat1 нет, пока не выполнялся ANALYZE
+        return None
+    if row is None:
+        return None
+    # В sqlite_stat1 первое число строки stat — число строк таблицы
+    count = int(float(str(row[0]).split()[0]))
+    return count if count > 0 else None
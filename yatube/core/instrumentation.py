@@ -0,0 +1,268 @@
+"""Замеры обработки запросов по представлениям.
+
+InstrumentationMiddleware считает для каждого запроса число SQL-запросов
+и время базы, время отрисовки шаблонов и попадания в кэш, отдаёт их
+в заголовке Server-Timing и копит суммы по имени представления
+(request.resolver_match.view_name). Раз в INSTRUMENTATION_FLUSH_INTERVAL
+секунд суммы процесса записываются в кэш, откуда их собирают страница
+core:request_stats и manage.py request_stats.
+
+Время шаблонов замеряет бэкенд InstrumentedTemplates, попадания в кэш
+приходят сигналом core.signals.cache_read. Те же замеры получает
+core.metrics. Если выключены и INSTRUMENTATION, и METRICS, middleware
+исключается из цепочки при загрузке, а шаблоны отрисовывает обычный
+бэкенд, так что выключенные замеры ничего не стоят.
+"""
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+from .signals import request_measured
+
+PROCESSES_KEY = 'core:instrumentation-processes'
+RESET_KEY = 'core:instrumentation-reset'
+STATS_KEY = 'core:instrumentation:{pid}'
+
+UNRESOLVED = '<unresolved>'
+
+# Суммы по представлению; время хранится в секундах
+FIELDS = (
+    'requests', 'queries', 'db', 'templates', 'cache_hits', 'cache_misses',
+    'total', 'max',
+)
+
+_local = threading.local()
+_UNKNOWN = object()
+
+
+class Measurement:
+    """Замеры одного запроса; сам служит обёрткой execute_wrapper."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.templates = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.rendering = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+    def server_timing(self, total):
+        # Значения заголовка — только ASCII
+        return ', '.join((
+            f'db;dur={self.db * 1000:.2f};desc="{self.queries} queries"',
+            f'tpl;dur={self.templates * 1000:.2f}',
+            f'cache;desc="{self.cache_hits} hits, '
+            f'{self.cache_misses} misses"',
+            f'total;dur={total * 1000:.2f}',
+        ))
+
+
+def current():
+    """Замеры текущего запроса или None вне InstrumentationMiddleware."""
+    return getattr(_local, 'measurement', None)
+
+
+def record_cache(sender, hits, misses, **kwargs):
+    """Обработчик core.signals.cache_read."""
+    measurement = current()
+    if measurement is not None:
+        measurement.cache_hits += hits
+        measurement.cache_misses += misses
+
+
+class InstrumentedTemplate:
+    """Шаблон бэкенда Django, отрисовка которого попадает в замеры."""
+
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, context=None, request=None):
+        measurement = current()
+        if measurement is None or measurement.rendering:
+            return self._template.render(context, request)
+        # Вложенные отрисовки уже входят во время внешней
+        measurement.rendering = True
+        started = time.perf_counter()
+        try:
+            return self._template.render(context, request)
+        finally:
+            measurement.templates += time.perf_counter() - started
+            measurement.rendering = False
+
+
+class InstrumentedTemplates(DjangoTemplates):
+    """Бэкенд DjangoTemplates с замером времени отрисовки.
+
+    Время шаблона включает запросы ленивых QuerySet, выполненные при
+    отрисовке, поэтому в Server-Timing оно пересекается со временем базы.
+    """
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name))
+
+
+class Stats:
+    """Суммы замеров процесса по представлениям."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+        self.flushed = 0.0
+        self.generation = _UNKNOWN
+
+    def add(self, view, measurement, total):
+        with self.lock:
+            row = self.views.get(view)
+            if row is None:
+                row = self.views[view] = dict.fromkeys(FIELDS, 0)
+            row['requests'] += 1
+            row['queries'] += measurement.queries
+            row['db'] += measurement.db
+            row['templates'] += measurement.templates
+            row['cache_hits'] += measurement.cache_hits
+            row['cache_misses'] += measurement.cache_misses
+            row['total'] += total
+            row['max'] = max(row['max'], total)
+            now = time.monotonic()
+            due = now - self.flushed >= settings.INSTRUMENTATION_FLUSH_INTERVAL
+            if due:
+                self.flushed = now
+        if due:
+            self.flush()
+
+    def flush(self):
+        pid = os.getpid()
+        values = cache.get_many([PROCESSES_KEY, RESET_KEY])
+        generation = values.get(RESET_KEY)
+        with self.lock:
+            if (
+                self.generation is not _UNKNOWN
+                and generation != self.generation
+            ):
+                # Замеры сброшены из другого процесса
+                self.views = {}
+            self.generation = generation
+            snapshot = {view: dict(row) for view, row in self.views.items()}
+        cache.set(STATS_KEY.format(pid=pid), snapshot, None)
+        processes = values.get(PROCESSES_KEY) or set()
+        if pid not in processes:
+            cache.set(PROCESSES_KEY, processes | {pid}, None)
+
+    def clear(self, generation):
+        with self.lock:
+            self.views = {}
+            self.generation = generation
+
+
+_stats = Stats()
+# Суммы родителя остаются в его записи, дочерний процесс начинает с нуля
+os.register_at_fork(after_in_child=lambda: _stats.views.clear())
+
+
+def collect():
+    """Суммы замеров всех процессов: имя представления -> словарь FIELDS.
+
+    Учитываются замеры, уже записанные процессами в кэш.
+    """
+    processes = cache.get(PROCESSES_KEY) or set()
+    views = {}
+    stored = cache.get_many([STATS_KEY.format(pid=pid) for pid in processes])
+    for snapshot in stored.values():
+        for view, row in snapshot.items():
+            total = views.setdefault(view, dict.fromkeys(FIELDS, 0))
+            for field in FIELDS:
+                if field == 'max':
+                    total[field] = max(total[field], row[field])
+                else:
+                    total[field] += row[field]
+    return views
+
+
+def summary():
+    """Средние значения по представлениям, самые затратные — первыми."""
+    rows = []
+    for view, row in collect().items():
+        requests = row['requests'] or 1
+        rows.append({
+            'view': view,
+            'requests': row['requests'],
+            'queries': round(row['queries'] / requests, 1),
+            'db_ms': round(row['db'] * 1000 / requests, 2),
+            'templates_ms': round(row['templates'] * 1000 / requests, 2),
+            'total_ms': round(row['total'] * 1000 / requests, 2),
+            'max_ms': round(row['max'] * 1000, 2),
+            'cache_hits': row['cache_hits'],
+            'cache_misses': row['cache_misses'],
+        })
+    rows.sort(key=lambda row: row['total_ms'] * row['requests'], reverse=True)
+    return rows
+
+
+def reset():
+    """Удаляет накопленные замеры всех процессов."""
+    processes = cache.get(PROCESSES_KEY) or set()
+    cache.delete_many(
+        [STATS_KEY.format(pid=pid) for pid in processes] + [PROCESSES_KEY]
+    )
+    generation = time.time()
+    cache.set(RESET_KEY, generation, None)
+    _stats.clear(generation)
+
+
+class InstrumentationMiddleware:
+    """Замеряет запрос для Server-Timing и метрик core.metrics.
+
+    Каждое соединение оборачивается одним execute_wrapper; замеры
+    получают подписчики сигнала core.signals.request_measured.
+    """
+
+    def __init__(self, get_response):
+        if not (settings.INSTRUMENTATION or settings.METRICS):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        measurement = Measurement()
+        _local.measurement = measurement
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(measurement)
+                    )
+                response = self.get_response(request)
+        finally:
+            _local.measurement = None
+        total = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else UNRESOLVED
+        if settings.INSTRUMENTATION:
+            response['Server-Timing'] = measurement.server_timing(total)
+            _stats.add(view, measurement, total)
+        request_measured.send(
+            sender=self.__class__, view=view, measurement=measurement,
+            total=total,
+        )
+        return response
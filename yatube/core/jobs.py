@@ -0,0 +1,114 @@
+"""Очередь фоновых задач поверх таблицы core.Job.
+
+Задача — функция, помеченная декоратором @task в модуле tasks.py
+любого приложения. Вызов func.delay(...) кладёт задачу в ту же
+транзакцию, что и изменения данных, а manage.py runworker выполняет её
+с повторами при ошибках. При settings.TASKS_EAGER задачи выполняются
+сразу, без очереди.
+"""
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def task(name=None, max_attempts=None):
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        registry[task_name] = func
+        func.task_name = task_name
+        func.delay = lambda *args, **kwargs: enqueue(
+            task_name, args, kwargs, max_attempts=max_attempts
+        )
+        return func
+    return decorator
+
+
+def enqueue(name, args=(), kwargs=None, max_attempts=None, delay=0):
+    if settings.TASKS_EAGER:
+        registry[name](*args, **(kwargs or {}))
+        return None
+    return Job.objects.create(
+        name=name,
+        payload=json.dumps({'args': list(args), 'kwargs': kwargs or {}}),
+        max_attempts=max_attempts or settings.TASKS_MAX_ATTEMPTS,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def claim():
+    """Берёт в работу первую готовую задачу или возвращает None.
+
+    Задача считается взятой, только если UPDATE со старым статусом
+    изменил строку, поэтому несколько воркеров не выполнят её дважды.
+    Задачи, зависшие в работе дольше TASKS_LOCK_TIMEOUT, возвращаются
+    в очередь.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+    ready = Q(status=Job.PENDING) | Q(
+        status=Job.RUNNING, locked_at__lt=stale
+    )
+    candidates = Job.objects.filter(ready, run_at__lte=now).order_by(
+        'run_at', 'pk'
+    ).values_list('pk', 'status', 'locked_at')[:10]
+    for pk, status, locked_at in candidates:
+        claimed = Job.objects.filter(
+            pk=pk, status=status, locked_at=locked_at
+        ).update(status=Job.RUNNING, locked_at=now)
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run(job):
+    payload = json.loads(job.payload)
+    job.attempts += 1
+    try:
+        func = registry[job.name]
+        func(*payload['args'], **payload['kwargs'])
+    except Exception:
+        job.last_error = traceback.format_exc()
+        logger.exception('Задача %s завершилась ошибкой', job)
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+            job.finished = timezone.now()
+        else:
+            job.status = Job.PENDING
+            job.run_at = timezone.now() + timedelta(
+                seconds=settings.TASKS_RETRY_DELAY * 2 ** (job.attempts - 1)
+            )
+    else:
+        job.status = Job.DONE
+        job.finished = timezone.now()
+    job.locked_at = None
+    job.save()
+    return job
+
+
+def run_pending(limit=None):
+    """Выполняет готовые задачи; возвращает число обработанных."""
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim()
+        if job is None:
+            break
+        run(job)
+        processed += 1
+    return processed
+
+
+def retry_failed():
+    return Job.objects.filter(status=Job.FAILED).update(
+        status=Job.PENDING, attempts=0, run_at=timezone.now(), finished=None
+    )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+from sorl.thumbnail import delete
+from sorl.thumbnail.images import ImageFile
+
+from core.storage import media_storage, orphans
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из хранилища картинок файлы, на которые не ссылается ни '
+        'одна строка, вместе с их превью'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=float, default=24,
+            help='Не трогать файлы, изменённые за последние столько часов: '
+                 'на них могут сослаться ещё не сохранённые строки',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено',
+        )
+
+    def handle(self, *args, **options):
+        removed = freed = 0
+        for name in list(orphans(media_storage, options['min_age'] * 3600)):
+            size = media_storage.size(name)
+            if options['dry_run']:
+                self.stdout.write(name)
+            else:
+                # Превью и записи sorl о них удаляются вместе с файлом
+                delete(ImageFile(name, media_storage))
+            removed += 1
+            freed += size
+        action = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} файлов: {removed}, {filesizeformat(freed)}'
+        ))
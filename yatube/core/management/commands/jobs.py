@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from core import jobs
+from core.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Показывает состояние очереди фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--failed',
+            type=int,
+            default=5,
+            help='Сколько последних ошибок вывести',
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Вернуть задачи с ошибкой в очередь',
+        )
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            self.stdout.write(f'Возвращено в очередь: {jobs.retry_failed()}')
+        rows = Job.objects.order_by().values('name', 'status').annotate(
+            total=Count('pk')
+        ).order_by('name', 'status')
+        for row in rows:
+            self.stdout.write(
+                f'{row["name"]:<50} {row["status"]:<8} {row["total"]}'
+            )
+        failed = Job.objects.filter(status=Job.FAILED).order_by('-finished')
+        for job in failed[:options['failed']]:
+            self.stdout.write(self.style.ERROR(str(job)))
+            self.stdout.write(job.last_error)
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import instrumentation
+
+ORDERING = {
+    'total': lambda row: row['total_ms'] * row['requests'],
+    'requests': lambda row: row['requests'],
+    'queries': lambda row: row['queries'],
+    'db': lambda row: row['db_ms'],
+    'templates': lambda row: row['templates_ms'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает замеры запросов по представлениям: SQL-запросы, время '
+        'базы и шаблонов, попадания в кэш (нужен YATUBE_INSTRUMENTATION=1)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sort',
+            choices=ORDERING,
+            default='total',
+            help='Порядок строк: суммарное время, число запросов или '
+                 'средние SQL-запросы, время базы и шаблонов',
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Удалить накопленные замеры после вывода',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.INSTRUMENTATION:
+            self.stderr.write(self.style.WARNING(
+                'Замеры выключены: новые запросы не учитываются'
+            ))
+        rows = sorted(
+            instrumentation.summary(),
+            key=ORDERING[options['sort']],
+            reverse=True,
+        )
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{"представление":<28}{"запросов":>9}{"SQL":>7}'
+            f'{"база, мс":>10}{"шабл., мс":>10}{"всего, мс":>10}'
+            f'{"макс., мс":>10}{"кэш":>12}'
+        ))
+        for row in rows:
+            self.stdout.write(
+                f'{row["view"]:<28}{row["requests"]:>9}{row["queries"]:>7}'
+                f'{row["db_ms"]:>10}{row["templates_ms"]:>10}'
+                f'{row["total_ms"]:>10}{row["max_ms"]:>10}'
+                f'{row["cache_hits"]:>6}/{row["cache_misses"]:<5}'
+            )
+        if options['reset']:
+            instrumentation.reset()
+            self.stdout.write('Замеры сброшены')
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди core.Job'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить готовые задачи и завершиться',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Пауза между опросами пустой очереди, секунд',
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            processed = jobs.run_pending()
+            self.stdout.write(f'Выполнено задач: {processed}')
+            return
+        self.stdout.write('Воркер запущен, Ctrl+C для остановки')
+        try:
+            while True:
+                if not jobs.run_pending(limit=100):
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write('Воркер остановлен')
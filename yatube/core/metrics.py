@@ -0,0 +1,284 @@
+"""Метрики в текстовом формате Prometheus.
+
+По замерам core.instrumentation.InstrumentationMiddleware (сигнал
+core.signals.request_measured) записываются гистограмма времени ответа
+и число SQL-запросов по имени представления; сигналы добавляют счётчики
+созданных постов, комментариев и подписок, открытых соединений с базой
+и попаданий и промахов по каждому кэшу (core.signals.cache_read).
+Страница /metrics (core.views.prometheus_metrics) отдаёт всё это
+одним текстом.
+
+Значения копятся в памяти процесса. Если задан METRICS_FILE, процесс
+раз в METRICS_FLUSH_INTERVAL секунд переносит накопленные приращения в
+общий файл SQLite, и /metrics показывает сумму по всем воркерам; без
+файла видны только метрики процесса, ответившего на запрос.
+"""
+import atexit
+import bisect
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+
+from .db import local_sqlite
+
+HISTOGRAM_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+BOUNDS = [str(bound) for bound in HISTOGRAM_BUCKETS] + ['+Inf']
+
+CACHE_COUNTERS = ('yatube_cache_hits_total', 'yatube_cache_misses_total')
+
+FAMILIES = {
+    'yatube_http_request_duration_seconds': (
+        'histogram', 'Время обработки запроса по представлениям',
+    ),
+    'yatube_db_queries_total': (
+        'counter', 'SQL-запросы по представлениям',
+    ),
+    'yatube_db_query_seconds_total': (
+        'counter', 'Время SQL-запросов по представлениям',
+    ),
+    'yatube_db_connections_total': (
+        'counter', 'Открытые соединения с базой данных',
+    ),
+    'yatube_objects_created_total': (
+        'counter', 'Созданные посты, комментарии и подписки',
+    ),
+    'yatube_cache_hits_total': ('counter', 'Попадания в кэш'),
+    'yatube_cache_misses_total': ('counter', 'Промахи кэша'),
+    'yatube_cache_hit_ratio': (
+        'gauge', 'Доля попаданий в кэш с момента запуска',
+    ),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metrics (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (name, labels)
+)
+"""
+
+_local = threading.local()
+
+
+def _connect(path):
+    return local_sqlite(_local, path, SCHEMA)
+
+
+class Registry:
+    """Значения метрик процесса: (имя, метки) -> число.
+
+    С METRICS_FILE здесь лежат только ещё не записанные в файл
+    приращения.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        self.flushed = time.monotonic()
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def maybe_flush(self):
+        if not settings.METRICS_FILE:
+            return
+        now = time.monotonic()
+        if now - self.flushed >= settings.METRICS_FLUSH_INTERVAL:
+            self.flushed = now
+            self.flush()
+
+    def flush(self):
+        if not settings.METRICS_FILE:
+            return
+        with self.lock:
+            pending, self.values = self.values, {}
+        if not pending:
+            return
+        db = _connect(settings.METRICS_FILE)
+        try:
+            db.execute('BEGIN IMMEDIATE')
+            db.executemany(
+                'INSERT INTO metrics (name, labels, value) VALUES (?, ?, ?) '
+                'ON CONFLICT (name, labels) '
+                'DO UPDATE SET value = value + excluded.value',
+                [
+                    (name, json.dumps(labels), value)
+                    for (name, labels), value in pending.items()
+                ],
+            )
+            db.execute('COMMIT')
+        except sqlite3.Error:
+            if db.in_transaction:
+                db.execute('ROLLBACK')
+            # Приращения не теряются: их запишет следующая попытка
+            with self.lock:
+                for key, value in pending.items():
+                    self.values[key] = self.values.get(key, 0) + value
+            raise
+
+    def collect(self):
+        """Все значения: из файла (после записи своих) или из памяти."""
+        if not settings.METRICS_FILE:
+            with self.lock:
+                return dict(self.values)
+        self.flush()
+        rows = _connect(settings.METRICS_FILE).execute(
+            'SELECT name, labels, value FROM metrics'
+        )
+        return {
+            (name, tuple(map(tuple, json.loads(labels)))): value
+            for name, labels, value in rows
+        }
+
+    def clear(self):
+        with self.lock:
+            self.values = {}
+        if settings.METRICS_FILE:
+            _connect(settings.METRICS_FILE).execute('DELETE FROM metrics')
+
+
+registry = Registry()
+# Дочерний процесс не должен повторно записать приращения родителя
+os.register_at_fork(after_in_child=lambda: registry.values.clear())
+
+
+@atexit.register
+def _flush_at_exit():
+    if settings.configured and settings.METRICS:
+        try:
+            registry.flush()
+        except sqlite3.Error:
+            pass
+
+
+def inc(name, value=1, **labels):
+    if settings.METRICS:
+        registry.inc(name, tuple(sorted(labels.items())), value)
+
+
+def observe(name, value, **labels):
+    """Добавляет значение в гистограмму name."""
+    if not settings.METRICS:
+        return
+    labels = tuple(sorted(labels.items()))
+    index = bisect.bisect_left(HISTOGRAM_BUCKETS, value)
+    bound = (
+        str(HISTOGRAM_BUCKETS[index]) if index < len(HISTOGRAM_BUCKETS)
+        else '+Inf'
+    )
+    registry.inc(f'{name}_bucket', labels + (('le', bound),))
+    registry.inc(f'{name}_sum', labels, value)
+    registry.inc(f'{name}_count', labels)
+
+
+def cache_lookups(sender, name, hits, misses, **kwargs):
+    """Обработчик core.signals.cache_read."""
+    if settings.METRICS:
+        labels = (('cache', name),)
+        if hits:
+            registry.inc('yatube_cache_hits_total', labels, hits)
+        if misses:
+            registry.inc('yatube_cache_misses_total', labels, misses)
+
+
+def record_request(sender, view, measurement, total, **kwargs):
+    """Обработчик core.signals.request_measured."""
+    if not settings.METRICS:
+        return
+    observe('yatube_http_request_duration_seconds', total, view=view)
+    inc('yatube_db_queries_total', measurement.queries, view=view)
+    inc('yatube_db_query_seconds_total', measurement.db, view=view)
+    registry.maybe_flush()
+
+
+def count_connection(sender, connection, **kwargs):
+    """Обработчик connection_created: считает новые соединения."""
+    inc('yatube_db_connections_total', alias=connection.alias)
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', '\\\\').replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+def _sample(name, labels, value):
+    if labels:
+        name += '{' + ','.join(
+            f'{key}="{_escape(label)}"' for key, label in labels
+        ) + '}'
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return f'{name} {value}'
+
+
+def _histograms(values):
+    """Накопительные корзины гистограмм из значений по корзинам."""
+    buckets = {}
+    for (name, labels), value in values.items():
+        if name.endswith('_bucket'):
+            base = tuple(item for item in labels if item[0] != 'le')
+            counts = buckets.setdefault((name, base), dict.fromkeys(BOUNDS, 0))
+            counts[dict(labels)['le']] += value
+    result = {}
+    for (name, labels), counts in buckets.items():
+        total = 0
+        for bound in BOUNDS:
+            total += counts[bound]
+            result[(name, labels + (('le', bound),))] = total
+    return result
+
+
+def _hit_ratios(values):
+    result = {}
+    for name, labels in values:
+        if name not in CACHE_COUNTERS:
+            continue
+        hits, misses = (values.get((key, labels), 0) for key in CACHE_COUNTERS)
+        result[('yatube_cache_hit_ratio', labels)] = round(
+            hits / (hits + misses), 4
+        )
+    return result
+
+
+def render():
+    """Текст страницы /metrics."""
+    values = registry.collect()
+    values.update(_hit_ratios(values))
+    values.update(_histograms(values))
+    lines = []
+    for family, (kind, help_text) in FAMILIES.items():
+        names = (
+            [f'{family}_bucket', f'{family}_sum', f'{family}_count']
+            if kind == 'histogram' else [family]
+        )
+
+        def order(key):
+            # Серии одного набора меток рядом, корзины по возрастанию
+            name, labels = key
+            labels = dict(labels)
+            bound = labels.pop('le', '+Inf')
+            return (
+                sorted(labels.items()), names.index(name),
+                BOUNDS.index(bound),
+            )
+
+        keys = sorted(
+            (key for key in values if key[0] in names), key=order
+        )
+        if not keys:
+            continue
+        lines.append(f'# HELP {family} {help_text}')
+        lines.append(f'# TYPE {family} {kind}')
+        lines.extend(_sample(*key, values[key]) for key in keys)
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,16 @@
+"""Сигналы замеров.
+
+Источники замеров — кэш core.cache.SQLiteCache и InstrumentationMiddleware
+— только отправляют сигналы, а core.instrumentation и core.metrics
+подписываются на них в CoreConfig.ready(). Так кэш не зависит от
+модулей, которые собирают замеры.
+"""
+from django.dispatch import Signal
+
+# Кэш прочитал ключи: name — имя кэша в CACHES, hits и misses — число
+# найденных и не найденных ключей
+cache_read = Signal(providing_args=['name', 'hits', 'misses'])
+
+# Запрос обработан: view — имя представления, measurement — замеры
+# core.instrumentation.Measurement, total — время ответа в секундах
+request_measured = Signal(providing_args=['view', 'measurement', 'total'])
@@ -0,0 +1,116 @@
+"""Хранилище файлов с адресацией по содержимому.
+
+ContentAddressedStorage сохраняет файл под именем из SHA-256 его
+содержимого: posts/3f/a2/3fa2….jpg, где posts/ — upload_to поля.
+Повторная загрузка той же картинки получает то же имя и не занимает
+места на диске, а превью sorl, привязанные к имени, для неё уже
+готовы.
+
+Поэтому на один файл могут ссылаться несколько строк, и при удалении
+или замене картинки файл не удаляется. Ссылки из строк считает
+references(), файлы без ссылок удаляет manage.py gc_media.
+"""
+import hashlib
+import os
+import re
+import time
+from collections import Counter
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db.models import Count, FileField
+
+BLOB_NAME = re.compile(r'[0-9a-f]{64}(\.[0-9a-z]+)?')
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище, в котором одинаковые файлы хранятся один раз."""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = content_hash(content)
+        extension = os.path.splitext(name)[1].lower()
+        name = os.path.join(
+            os.path.dirname(name), digest[:2], digest[2:4],
+            digest + extension,
+        )
+        if self.exists(name):
+            # Свежая дата не даёт gc_media удалить файл, пока строка,
+            # которая на него сошлётся, ещё не сохранена
+            os.utime(self.path(name))
+            return name
+        saved = self._save(name, content)
+        if saved != name:
+            # Тот же файл одновременно сохранил другой процесс
+            self.delete(saved)
+        return name
+
+    def blobs(self, directory):
+        """Имена файлов хранилища в каталоге directory (upload_to)."""
+        for first in self._subdirs(directory):
+            for second in self._subdirs(os.path.join(directory, first)):
+                path = os.path.join(directory, first, second)
+                for filename in self.listdir(path)[1]:
+                    if BLOB_NAME.fullmatch(filename):
+                        yield os.path.join(path, filename)
+
+    def _subdirs(self, path):
+        if not self.exists(path):
+            return []
+        return [
+            name for name in self.listdir(path)[0]
+            if re.fullmatch(r'[0-9a-f]{2}', name)
+        ]
+
+
+def file_fields(storage):
+    """Поля моделей, которые хранят файлы в storage."""
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, FileField) and field.storage is storage:
+                yield model, field
+
+
+def references(storage):
+    """Число строк, ссылающихся на каждый файл storage.
+
+    На каждое поле — один запрос с GROUP BY.
+    """
+    counts = Counter()
+    for model, field in file_fields(storage):
+        rows = model._default_manager.exclude(
+            **{field.name: ''}
+        ).order_by().values_list(field.name).annotate(count=Count('pk'))
+        for name, count in rows:
+            counts[name] += count
+    return counts
+
+
+def orphans(storage, min_age):
+    """Файлы без ссылок, не изменявшиеся min_age секунд."""
+    directories = {
+        field.upload_to for _, field in file_fields(storage)
+        if isinstance(field.upload_to, str)
+    }
+    used = references(storage)
+    deadline = time.time() - min_age
+    for directory in sorted(directories):
+        for name in storage.blobs(directory):
+            if used[name]:
+                continue
+            if os.path.getmtime(storage.path(name)) <= deadline:
+                yield name
+
+
+media_storage = ContentAddressedStorage()
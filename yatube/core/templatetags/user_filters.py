@@ -6,3 +6,11 @@ register = template.Library()
 @register.filter
 def addclass(field, css):
     return field.as_widget(attrs={'class': css})
+
+
+@register.filter
+def page_window(page_obj, size=3):
+    """Номера страниц рядом с текущей вместо всего page_range."""
+    first = max(page_obj.number - size, 1)
+    last = min(page_obj.number + size, page_obj.paginator.num_pages)
+    return range(first, last + 1)
@@ -0,0 +1,21 @@
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """Запуск тестов с кэшами из yatube.settings_test.
+
+    Рабочие кэши лежат в файлах SQLite, общих для всех процессов;
+    тесты не должны читать и портить их записи.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        from yatube.settings_test import CACHES
+
+        super().setup_test_environment(**kwargs)
+        self._caches = override_settings(CACHES=CACHES)
+        self._caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._caches.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,102 @@
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+
+from ..cache import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = f'{self.directory}/cache.sqlite3'
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_values_shared_between_instances(self):
+        """Запись видна другому экземпляру кэша на том же файле."""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.make_cache().get('key'), {'value': 1})
+
+    def test_expiration(self):
+        """Просроченная запись не возвращается."""
+        self.cache.set('key', 'value', timeout=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_many_and_incr(self):
+        """get_many, delete_many и incr работают как у других кэшей."""
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2}
+        )
+        self.assertEqual(self.cache.incr('a', 5), 6)
+        with self.assertRaises(ValueError):
+            self.cache.incr('c')
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
+
+    def test_lru_eviction_by_entries(self):
+        """При переполнении вытесняются давно не читавшиеся записи."""
+        cache = self.make_cache(
+            MAX_ENTRIES=3, CULL_FREQUENCY=3, ACCESS_PRECISION=0
+        )
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+            time.sleep(0.01)
+        cache.get('a')
+        cache.set('d', 'd')
+        self.assertEqual(cache.get_many(['a', 'b', 'c', 'd']), {
+            'a': 'a', 'c': 'c', 'd': 'd'
+        })
+
+    def test_size_limit(self):
+        """Суммарный объём записей не превышает MAX_SIZE."""
+        cache = self.make_cache(MAX_SIZE=10000)
+        for i in range(20):
+            cache.set(f'key-{i}', b'x' * 1000)
+        total = cache._db.execute('SELECT TOTAL(size) FROM cache').fetchone()
+        self.assertLessEqual(total[0], 10000)
+        self.assertEqual(cache.get('key-19'), b'x' * 1000)
+
+    def test_stats_follow_writes(self):
+        """Строка cache_stats совпадает с содержимым таблицы."""
+        def assert_stats():
+            db = self.cache._db
+            self.assertEqual(
+                db.execute('SELECT entries, size FROM cache_stats').fetchone(),
+                db.execute('SELECT COUNT(*), TOTAL(size) FROM cache')
+                .fetchone(),
+            )
+
+        self.cache.set_many({'a': b'x' * 100, 'b': 1, 'c': 'value'})
+        assert_stats()
+        self.cache.set('a', b'x' * 10)
+        self.cache.add('b', 2)
+        self.cache.incr('b', 1000000)
+        assert_stats()
+        self.cache.delete('a')
+        self.cache.delete_many(['b', 'missing'])
+        assert_stats()
+        self.cache.clear()
+        assert_stats()
+
+
+class TestCachesTests(SimpleTestCase):
+    def test_tests_use_memory_caches(self):
+        """Тесты не пишут в рабочие файлы кэша."""
+        for alias in settings.CACHES:
+            with self.subTest(alias=alias):
+                self.assertIsInstance(caches[alias], LocMemCache)
@@ -0,0 +1,48 @@
+import shutil
+import tempfile
+
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+
+from ..db import apply_sqlite_pragmas
+
+
+class SQLitePragmasTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_connection(self):
+        settings_dict = dict(connection.settings_dict)
+        settings_dict['NAME'] = f'{self.directory}/db.sqlite3'
+        return DatabaseWrapper(settings_dict, alias='pragmas')
+
+    @override_settings(
+        SQLITE_PRAGMAS={'journal_mode': 'WAL', 'cache_size': -1234}
+    )
+    def test_pragmas_applied_on_connect(self):
+        """Новое соединение SQLite получает прагмы из настроек."""
+        wrapper = self.make_connection()
+        wrapper.ensure_connection()
+        try:
+            with wrapper.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                self.assertEqual(cursor.fetchone()[0], 'wal')
+                cursor.execute('PRAGMA cache_size')
+                self.assertEqual(cursor.fetchone()[0], -1234)
+        finally:
+            wrapper.close()
+
+    @override_settings(SQLITE_PRAGMAS={'journal_mode': 'WAL'})
+    def test_other_vendors_skipped(self):
+        """Прагмы не выполняются на базах, отличных от SQLite."""
+        class Connection:
+            vendor = 'postgresql'
+
+            def cursor(self):
+                raise AssertionError('курсор не нужен')
+
+        apply_sqlite_pragmas(None, Connection())
@@ -0,0 +1,103 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import instrumentation
+
+User = get_user_model()
+
+CACHE_DIR = tempfile.mkdtemp()
+
+INSTRUMENTED_TEMPLATES = [
+    {**settings.TEMPLATES[0],
+     'BACKEND': 'core.instrumentation.InstrumentedTemplates'},
+]
+
+
+@override_settings(
+    INSTRUMENTATION=True,
+    INSTRUMENTATION_FLUSH_INTERVAL=0,
+    TEMPLATES=INSTRUMENTED_TEMPLATES,
+    CACHES={'default': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': f'{CACHE_DIR}/default.sqlite3',
+    }},
+)
+class InstrumentationTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        instrumentation.reset()
+        self.author = User.objects.create_user(username='author')
+        Post.objects.create(author=self.author, text='Тестовый пост')
+        self.client = Client()
+
+    def test_server_timing_header(self):
+        """Ответ содержит время базы, шаблонов и попадания в кэш."""
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'cache;desc=', 'total;dur='):
+            self.assertIn(metric, timing)
+
+    def test_stats_by_view_name(self):
+        """Замеры копятся по имени представления."""
+        for _ in range(2):
+            self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:profile', args=['author']))
+        stats = {row['view']: row for row in instrumentation.summary()}
+        index = stats['posts:index']
+        self.assertEqual(index['requests'], 2)
+        self.assertGreater(index['queries'], 0)
+        self.assertGreater(index['templates_ms'], 0)
+        self.assertGreater(index['cache_hits'] + index['cache_misses'], 0)
+        self.assertEqual(stats['posts:profile']['requests'], 1)
+
+    def test_stats_endpoint_for_staff(self):
+        """Сводку видит только персонал; POST сбрасывает замеры."""
+        url = reverse('core:request_stats')
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_user(
+            username='staff', is_staff=True
+        ))
+        data = json.loads(self.client.get(url).content)
+        self.assertTrue(data['enabled'])
+        self.assertIn(
+            'posts:index', [row['view'] for row in data['views']]
+        )
+        self.client.post(url)
+        # После сброса учтён только сам запрос на сброс
+        self.assertEqual(
+            [row['view'] for row in instrumentation.summary()],
+            ['core:request_stats'],
+        )
+
+    def test_command(self):
+        """manage.py request_stats выводит сводку и сбрасывает её."""
+        self.client.get(reverse('posts:index'))
+        out = StringIO()
+        call_command('request_stats', '--reset', stdout=out)
+        self.assertIn('posts:index', out.getvalue())
+        self.assertEqual(instrumentation.summary(), [])
+
+
+class DisabledInstrumentationTests(TestCase):
+    def test_middleware_not_used(self):
+        """Выключенный middleware исключается из цепочки."""
+        with self.assertRaises(MiddlewareNotUsed):
+            instrumentation.InstrumentationMiddleware(lambda request: None)
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
@@ -0,0 +1,60 @@
+from django.test import TestCase, override_settings
+
+from ..jobs import claim, run_pending, task
+from ..models import Job
+
+CALLS = []
+
+
+@task(name='core.tests.record')
+def record(value):
+    CALLS.append(value)
+
+
+@task(name='core.tests.broken', max_attempts=2)
+def broken():
+    raise ValueError('Ошибка задачи')
+
+
+@override_settings(TASKS_EAGER=False, TASKS_RETRY_DELAY=0)
+class JobsTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_delay_enqueues_and_worker_runs(self):
+        """Задача ждёт воркера и выполняется один раз."""
+        job = record.delay(42)
+        self.assertEqual(CALLS, [])
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(CALLS, [42])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(run_pending(), 0)
+
+    def test_failed_job_retried_then_failed(self):
+        """Упавшая задача повторяется до max_attempts."""
+        job = broken.delay()
+        with self.assertLogs('core.jobs', 'ERROR'):
+            run_pending(limit=1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertEqual(job.attempts, 1)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('Ошибка задачи', job.last_error)
+
+    def test_claimed_job_not_claimed_again(self):
+        """Взятая в работу задача не достаётся второму воркеру."""
+        record.delay(1)
+        self.assertIsNotNone(claim())
+        self.assertIsNone(claim())
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_mode(self):
+        """В режиме TASKS_EAGER задача выполняется сразу."""
+        record.delay(7)
+        self.assertEqual(CALLS, [7])
+        self.assertFalse(Job.objects.exists())
@@ -0,0 +1,106 @@
+import re
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import metrics
+from ..cache import SQLiteCache
+
+User = get_user_model()
+
+
+@override_settings(METRICS=True, METRICS_FILE=None)
+class MetricsTests(TestCase):
+    def setUp(self):
+        metrics.registry.clear()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_views_and_created_objects(self):
+        """Страница отдаёт гистограмму по представлениям и счётчики."""
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Тестовый пост')
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        self.assertIn(
+            '# TYPE yatube_http_request_duration_seconds histogram', text
+        )
+        self.assertIn(
+            'yatube_http_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 1', text
+        )
+        self.assertIn(
+            'yatube_http_request_duration_seconds_count'
+            '{view="posts:index"} 1', text
+        )
+        self.assertIn('yatube_objects_created_total{model="post"} 1', text)
+        self.assertIn('yatube_db_queries_total{view="posts:index"}', text)
+
+    @override_settings(INSTRUMENTATION=True)
+    def test_shares_instrumentation_measurement(self):
+        """Метрики и Server-Timing берут число запросов из одного замера."""
+        response = self.client.get(reverse('posts:index'))
+        queries = re.search(
+            r'desc="(\d+) queries"', response['Server-Timing']
+        ).group(1)
+        self.assertIn(
+            f'yatube_db_queries_total{{view="posts:index"}} {queries}\n',
+            metrics.render(),
+        )
+
+    def test_histogram_buckets_cumulative(self):
+        """Корзины гистограммы накопительные и идут по возрастанию."""
+        for value in (0.001, 0.2, 20):
+            metrics.observe('yatube_http_request_duration_seconds', value,
+                            view='v')
+        lines = [
+            line for line in metrics.render().splitlines()
+            if line.startswith('yatube_http_request_duration_seconds_bucket')
+        ]
+        self.assertEqual(len(lines), len(metrics.BOUNDS))
+        self.assertTrue(lines[0].endswith('le="0.005"} 1'))
+        self.assertTrue(lines[5].endswith('le="0.25"} 2'))
+        self.assertTrue(lines[-1].endswith('le="+Inf"} 3'))
+
+    def test_cache_hit_ratio(self):
+        """Попадания и промахи считаются по имени файла кэша."""
+        cache = SQLiteCache(f'{self.directory}/fragments.sqlite3', {})
+        cache.get('key')
+        cache.set('key', 'value')
+        cache.get('key')
+        text = metrics.render()
+        self.assertIn('yatube_cache_hits_total{cache="fragments"} 1', text)
+        self.assertIn('yatube_cache_misses_total{cache="fragments"} 1', text)
+        self.assertIn('yatube_cache_hit_ratio{cache="fragments"} 0.5', text)
+
+    def test_shared_file_sums_processes(self):
+        """В режиме общего файла /metrics показывает сумму процессов."""
+        with self.settings(METRICS_FILE=f'{self.directory}/metrics.sqlite3'):
+            other = metrics.Registry()
+            for registry in (metrics.registry, other):
+                registry.inc(
+                    'yatube_objects_created_total', (('model', 'comment'),)
+                )
+            other.flush()
+            self.assertIn(
+                'yatube_objects_created_total{model="comment"} 2',
+                metrics.render(),
+            )
+            metrics.registry.clear()
+
+    @override_settings(METRICS=False)
+    def test_disabled(self):
+        """Выключенные метрики не собираются и страница недоступна."""
+        metrics.inc('yatube_objects_created_total', model='post')
+        self.assertEqual(metrics.registry.collect(), {})
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
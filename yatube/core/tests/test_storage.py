@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import time
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from posts.models import Post
+
+from ..storage import media_storage, orphans, references
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+DAY = 24 * 60 * 60
+
+
+def png(color):
+    buffer = BytesIO()
+    Image.new('RGB', (10, 10), color).save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+
+    def make_old(self, name):
+        old = time.time() - 2 * DAY
+        os.utime(media_storage.path(name), (old, old))
+
+    def test_same_content_stored_once(self):
+        """Одинаковые файлы получают одно имя и хранятся один раз."""
+        first = media_storage.save('posts/a.PNG', png('red'))
+        second = media_storage.save('posts/b.png', png('red'))
+        other = media_storage.save('posts/a.png', png('blue'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertRegex(first, r'^posts/(\w\w)/(\w\w)/\1\2\w{60}\.png$')
+        self.assertEqual(
+            sorted(media_storage.blobs('posts/')), sorted([first, other])
+        )
+
+    def test_references_count_rows(self):
+        """Ссылки на файл считаются по строкам постов."""
+        name = media_storage.save('posts/a.png', png('red'))
+        for _ in range(2):
+            Post.objects.create(author=self.author, text='Пост', image=name)
+        Post.objects.create(author=self.author, text='Без картинки')
+        self.assertEqual(references(media_storage), {name: 2})
+
+    def test_gc_removes_old_orphans(self):
+        """gc_media удаляет старые файлы без ссылок вместе с превью."""
+        used = media_storage.save('posts/a.png', png('red'))
+        orphan = media_storage.save('posts/b.png', png('green'))
+        fresh = media_storage.save('posts/c.png', png('blue'))
+        Post.objects.create(author=self.author, text='Пост', image=used)
+        for name in (used, orphan):
+            self.make_old(name)
+        image = ImageFile(orphan, media_storage)
+        thumbnail = get_thumbnail(image, '5x5')
+        self.assertEqual(list(orphans(media_storage, DAY)), [orphan])
+
+        out = StringIO()
+        call_command('gc_media', dry_run=True, stdout=out)
+        self.assertIn(orphan, out.getvalue())
+        self.assertTrue(media_storage.exists(orphan))
+
+        call_command('gc_media', stdout=StringIO())
+        self.assertFalse(media_storage.exists(orphan))
+        self.assertFalse(thumbnail.storage.exists(thumbnail.name))
+        self.assertIsNone(default.kvstore.get(image))
+        self.assertTrue(media_storage.exists(used))
+        self.assertTrue(media_storage.exists(fresh))
+
+    def test_reupload_refreshes_file(self):
+        """Повторная загрузка защищает старый файл от gc_media."""
+        name = media_storage.save('posts/a.png', png('red'))
+        self.make_old(name)
+        media_storage.save('posts/again.png', png('red'))
+        self.assertEqual(list(orphans(media_storage, DAY)), [])
@@ -1,5 +1,10 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import render
 
+from . import instrumentation, metrics
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +20,24 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def request_stats(request):
+    """Замеры запросов по представлениям, собранные со всех процессов."""
+    if request.method == 'POST':
+        instrumentation.reset()
+    return JsonResponse({
+        'enabled': settings.INSTRUMENTATION,
+        'views': instrumentation.summary(),
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+def prometheus_metrics(request):
+    """Метрики для Prometheus в текстовом формате."""
+    if not settings.METRICS:
+        raise Http404
+    return HttpResponse(
+        metrics.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -1,12 +1,263 @@
-from django.contrib import admin
+from functools import reduce
+from operator import or_
 
-from yatube.settings import EMPTY_CONST
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.template.response import TemplateResponse
+from django.urls import path
 
-from .models import Comment, Follow, Group, Post
+from yatube.settings import (
+    ADMIN_FILTER_CHOICES, ADMIN_FILTER_SCAN, EMPTY_CONST, SEARCH_ADMIN_LIMIT
+)
+
+from . import export, moderation, search
+from .forms import ImageUploadMixin
+from .models import Comment, Follow, Group, Post, User
+from .paginators import EstimatedCountPaginator
+
+_UNSET = object()
+
+
+class RecentRelatedFieldListFilter(admin.RelatedFieldListFilter):
+    """Фильтр по связанному объекту без загрузки всей связанной таблицы.
+
+    Предлагает не больше ADMIN_FILTER_CHOICES объектов, встречающихся
+    в последних ADMIN_FILTER_SCAN строках, и выбранный сейчас объект.
+    """
+
+    def field_choices(self, field, request, model_admin):
+        recent = model_admin.model._default_manager.order_by(
+            '-pk'
+        ).values_list(field.attname, flat=True)[:ADMIN_FILTER_SCAN]
+        ids = list(dict.fromkeys(
+            value for value in recent if value is not None
+        ))[:ADMIN_FILTER_CHOICES]
+        if self.lookup_val and self.lookup_val.isdigit():
+            ids.append(int(self.lookup_val))
+        related = field.remote_field.model._default_manager.in_bulk(ids)
+        return [
+            (pk, str(related[pk])) for pk in dict.fromkeys(ids)
+            if pk in related
+        ]
+
+
+class RowAutocompleteSelect(AutocompleteSelect):
+    """Автодополнение, которое в строке списка не делает запроса.
+
+    Обычный виджет ищет подпись выбранного значения в базе для каждой
+    строки list_editable; здесь она берётся у объекта строки, уже
+    загруженного через list_select_related.
+    """
+    row_object = _UNSET
+
+    def optgroups(self, name, value, attr=None):
+        obj = self.row_object
+        selected = [str(item) for item in value if item not in ('', None)]
+        if obj is _UNSET or selected != ([str(obj.pk)] if obj else []):
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        if obj is not None:
+            options.append(self.create_option(
+                name, obj.pk, self.choices.field.label_from_instance(obj),
+                True, len(options),
+            ))
+        return [(None, options, 0)]
+
+
+class ChangeListRowForm(forms.ModelForm):
+    """Форма строки списка: виджетам отдаются связанные объекты строки."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, field in self.fields.items():
+            widget = getattr(field.widget, 'widget', field.widget)
+            if isinstance(widget, RowAutocompleteSelect):
+                widget.row_object = getattr(self.instance, name)
+
+
+class LargeTableAdminMixin:
+    """Список большой таблицы без COUNT(*) и выпадающих списков.
+
+    Связанные объекты выбираются автодополнением (autocomplete_fields),
+    в том числе в столбцах list_editable, а число строк оценивается
+    EstimatedCountPaginator.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs.setdefault('widget', RowAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using'),
+            ))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', ChangeListRowForm)
+        return super().get_changelist_form(request, **kwargs)
+
+
+class ExportMixin:
+    """Потоковая выгрузка выбранных объектов и всей таблицы.
+
+    Действия выгружают выбранные строки, адрес export/ в разделе модели
+    отдаёт всю таблицу: ?format=csv меняет формат, ?gzip=1 сжимает.
+    """
+    export_kind = None
+    actions = ('export_jsonl', 'export_csv')
+
+    def export_response(self, queryset, file_format, compress=False):
+        filename = f'{self.export_kind}.{file_format}'
+        content_type = export.CONTENT_TYPES[file_format]
+        if compress:
+            filename += '.gz'
+            content_type = 'application/gzip'
+        response = StreamingHttpResponse(
+            export.encoded(
+                export.lines(self.export_kind, file_format, queryset),
+                compress,
+            ),
+            content_type=content_type,
+        )
+        response['Content-Disposition'] = f'attachment; filename={filename}'
+        return response
+
+    def export_jsonl(self, request, queryset):
+        return self.export_response(queryset, 'jsonl')
+    export_jsonl.short_description = 'Выгрузить выбранные в JSONL'
+
+    def export_csv(self, request, queryset):
+        return self.export_response(queryset, 'csv')
+    export_csv.short_description = 'Выгрузить выбранные в CSV'
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path(
+                'export/',
+                self.admin_site.admin_view(self.export_view),
+                name='%s_%s_export' % info,
+            ),
+        ] + super().get_urls()
+
+    def export_view(self, request):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        file_format = request.GET.get('format', 'jsonl')
+        if file_format not in export.FORMATS:
+            file_format = 'jsonl'
+        return self.export_response(
+            None, file_format, compress=bool(request.GET.get('gzip'))
+        )
+
+
+class IndexedSearchMixin:
+    """Поиск в списке по индексам вместо LIKE по каждой строке.
+
+    Слова запроса ищутся в полнотекстовом индексе (text_search_ids),
+    а запрос целиком — как начало имени пользователя в полях
+    search_user_fields: диапазон по индексу auth_user.username
+    и подзапрос по индексу внешнего ключа.
+    """
+    search_user_fields = ()
+
+    def text_search_ids(self, search_term):
+        return []
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        conditions = []
+        ids = self.text_search_ids(search_term)
+        if ids:
+            conditions.append(Q(pk__in=ids))
+        if self.search_user_fields and ' ' not in search_term:
+            users = User.objects.filter(
+                search.prefix_q('username', search_term)
+            ).values('pk')
+            conditions.extend(
+                Q(**{f'{field}__in': users})
+                for field in self.search_user_fields
+            )
+        if not conditions:
+            return queryset.none(), False
+        return queryset.filter(reduce(or_, conditions)), False
+
+
+class BatchDeleteMixin:
+    """Удаление выбранных строк пачками через posts.moderation.
+
+    Заменяет delete_selected: стандартное действие загружает все объекты
+    ради страницы подтверждения и удаляет их по одному с сигналами.
+    Страница подтверждения здесь показывает только число строк.
+    """
+    batch_delete = None
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def delete_batched(self, request, queryset):
+        if request.POST.get('post') != 'yes':
+            return TemplateResponse(
+                request, 'admin/posts/delete_batched.html', {
+                    **self.admin_site.each_context(request),
+                    'title': 'Удаление пачками',
+                    'opts': self.model._meta,
+                    'count': queryset.count(),
+                    'batch_size': moderation.BATCH_SIZE,
+                    'selected': request.POST.getlist(
+                        helpers.ACTION_CHECKBOX_NAME
+                    ),
+                    'select_across': request.POST.get('select_across'),
+                    'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+                }
+            )
+        deleted = self.batch_delete(queryset)
+        self.message_user(
+            request,
+            f'Удалено: {deleted} ({self.model._meta.verbose_name_plural})',
+            messages.SUCCESS,
+        )
+    delete_batched.short_description = 'Удалить выбранные пачками'
+    delete_batched.allowed_permissions = ('delete',)
+
+
+class PostActionForm(helpers.ActionForm):
+    """Форма действий над постами с выбором группы для переноса."""
+    group = forms.ModelChoiceField(
+        Group.objects.all(),
+        required=False,
+        label='Группа',
+        widget=AutocompleteSelect(
+            Post._meta.get_field('group').remote_field, admin.site
+        ),
+    )
+
+
+class PostAdminForm(ImageUploadMixin, forms.ModelForm):
+    """Все поля поста; картинка обрабатывается как на сайте."""
+
+    class Meta:
+        model = Post
+        fields = '__all__'
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(
+    BatchDeleteMixin, IndexedSearchMixin, LargeTableAdminMixin, ExportMixin,
+    admin.ModelAdmin
+):
     list_display = (
         'pk',
         'text',
@@ -15,9 +266,48 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
-    search_fields = ('text',)
+    list_select_related = ('author', 'group')
+    form = PostAdminForm
+    autocomplete_fields = ('author', 'group')
+    search_fields = ('text', 'author__username')
+    search_user_fields = ('author',)
     list_filter = ('pub_date',)
     empty_value_display = EMPTY_CONST
+    export_kind = 'posts'
+    action_form = PostActionForm
+    actions = ExportMixin.actions + (
+        'move_to_group', 'remove_from_group', 'delete_batched'
+    )
+    batch_delete = staticmethod(moderation.delete_posts)
+
+    def text_search_ids(self, search_term):
+        return search.SearchResults(search_term).ids(0, SEARCH_ADMIN_LIMIT)
+
+    def move_to_group(self, request, queryset):
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        group = form.cleaned_data['group'] if form.is_valid() else None
+        if group is None:
+            self.message_user(
+                request, 'Выберите группу рядом со списком действий',
+                messages.WARNING,
+            )
+            return
+        moved = moderation.move_posts(queryset, group)
+        self.message_user(
+            request, f'Перенесено в группу «{group}»: {moved}',
+            messages.SUCCESS,
+        )
+    move_to_group.short_description = 'Перенести выбранные в группу'
+    move_to_group.allowed_permissions = ('change',)
+
+    def remove_from_group(self, request, queryset):
+        moved = moderation.move_posts(queryset, None)
+        self.message_user(
+            request, f'Убрано из групп: {moved}', messages.SUCCESS
+        )
+    remove_from_group.short_description = 'Убрать выбранные из групп'
+    remove_from_group.allowed_permissions = ('change',)
 
 
 @admin.register(Group)
@@ -34,7 +324,10 @@ class GroupAdmin(admin.ModelAdmin):
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(
+    BatchDeleteMixin, IndexedSearchMixin, LargeTableAdminMixin, ExportMixin,
+    admin.ModelAdmin
+):
     list_display = (
         'pk',
         'text',
@@ -42,17 +335,35 @@ class CommentAdmin(admin.ModelAdmin):
         'author',
         'created',
     )
-    search_fields = ('text', 'author')
-    list_filter = ('post', 'created')
+    list_select_related = ('post', 'author')
+    autocomplete_fields = ('post', 'author')
+    search_fields = ('text', 'author__username')
+    search_user_fields = ('author',)
+    list_filter = (('post', RecentRelatedFieldListFilter), 'created')
     empty_value_display = EMPTY_CONST
+    export_kind = 'comments'
+    actions = ExportMixin.actions + ('delete_batched',)
+    batch_delete = staticmethod(moderation.delete_comments)
+
+    def text_search_ids(self, search_term):
+        return search.comment_ids(search_term, SEARCH_ADMIN_LIMIT)
 
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(
+    IndexedSearchMixin, LargeTableAdminMixin, ExportMixin, admin.ModelAdmin
+):
     list_display = (
         'user',
         'author',
     )
-    search_fields = ('user', 'author')
-    list_filter = ('user', 'author',)
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+    search_user_fields = ('user', 'author')
+    list_filter = (
+        ('user', RecentRelatedFieldListFilter),
+        ('author', RecentRelatedFieldListFilter),
+    )
     empty_value_display = EMPTY_CONST
+    export_kind = 'follows'
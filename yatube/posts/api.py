@@ -0,0 +1,160 @@
+"""JSON API лент только для чтения.
+
+Представления используют те же запросы и паджинацию, что и HTML-ленты,
+и поддерживают условные GET (posts.conditional), чтобы клиенты
+и кэширующие прокси проверяли актуальность страницы ответом 304.
+"""
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_safe
+from django.views.decorators.vary import vary_on_cookie
+
+from . import counters
+from .conditional import (
+    conditional, follow_state, group_state, index_state, post_state,
+    profile_state
+)
+from .models import Group, Post
+from .utils import follow_posts, get_comments_page, get_page_obj
+
+User = get_user_model()
+
+
+def post_data(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'author': {
+            'username': post.author.username,
+            'full_name': post.author.get_full_name(),
+        },
+        'group': post.group and {
+            'slug': post.group.slug,
+            'title': post.group.title,
+        },
+        'image': post.image.url if post.image else None,
+        'image_width': post.image_width,
+        'image_height': post.image_height,
+        'comments_count': post.comments_count,
+        'url': reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+    }
+
+
+def comment_data(comment):
+    return {
+        'id': comment.pk,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+        'author': comment.author.username,
+    }
+
+
+def _link(request, **params):
+    query = request.GET.copy()
+    for name, value in params.items():
+        query[name] = value
+    return f'{request.path}?{query.urlencode()}'
+
+
+def page_links(request, page_obj, param=None):
+    """Адреса соседних страниц: по курсору или по номеру страницы."""
+    if getattr(page_obj.paginator, 'is_cursor', False):
+        param = param or 'cursor'
+        return {
+            'next': page_obj.has_next() and _link(
+                request, **{param: page_obj.next_cursor}
+            ) or None,
+            'previous': page_obj.has_previous() and _link(
+                request, **{param: page_obj.previous_cursor}
+            ) or None,
+        }
+    return {
+        'next': page_obj.has_next() and _link(
+            request, page=page_obj.next_page_number()
+        ) or None,
+        'previous': page_obj.has_previous() and _link(
+            request, page=page_obj.previous_page_number()
+        ) or None,
+    }
+
+
+def feed_response(request, post_list, count):
+    page_obj = get_page_obj(request, post_list, count)
+    paginator = page_obj.paginator
+    return JsonResponse({
+        'count': None if getattr(paginator, 'is_cursor', False)
+        else paginator.count,
+        **page_links(request, page_obj),
+        'results': [post_data(post) for post in page_obj],
+    })
+
+
+# Главная лента
+@require_safe
+@cache_control(public=True, no_cache=True)
+@conditional(index_state)
+def index(request):
+    return feed_response(
+        request, Post.objects.for_feed(), counters.posts_count
+    )
+
+
+# Лента группы
+@require_safe
+@cache_control(public=True, no_cache=True)
+@conditional(group_state)
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(
+        request,
+        group.group_posts.for_feed(),
+        lambda: counters.group_posts_count(group),
+    )
+
+
+# Посты автора
+@require_safe
+@cache_control(public=True, no_cache=True)
+@conditional(profile_state)
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(
+        request,
+        author.posts.for_feed(),
+        lambda: counters.author_posts_count(author),
+    )
+
+
+# Лента подписок текущего пользователя
+@require_safe
+@cache_control(private=True, no_cache=True)
+@vary_on_cookie
+@conditional(follow_state)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return JsonResponse(
+            {'detail': 'Требуется авторизация'}, status=401
+        )
+    return feed_response(
+        request,
+        follow_posts(request.user),
+        lambda: counters.feed_posts_count(request.user),
+    )
+
+
+# Пост с порцией комментариев
+@require_safe
+@cache_control(public=True, no_cache=True)
+@conditional(post_state)
+def post_detail(request, post_id):
+    post = get_object_or_404(Post.objects.for_feed(), pk=post_id)
+    comments = get_comments_page(request, post)
+    return JsonResponse({
+        'post': post_data(post),
+        **page_links(request, comments, param='comments'),
+        'comments': [comment_data(comment) for comment in comments],
+    })
@@ -0,0 +1,56 @@
+"""Помощники массовой загрузки данных в обход сигналов.
+
+bulk_create не вызывает post_save, поэтому после загрузки производные
+данные (счётчики, поисковый индекс, ленты, версия кэша) нужно обновить:
+для добавленных постов — функцией add_derived(), после наполнения базы
+с нуля — пересчётом целиком в rebuild_derived().
+"""
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from . import counters, fragments, search, timeline
+from .models import Post
+
+
+@contextmanager
+def keep_field_value(model, name):
+    """Отключает auto_now_add, чтобы сохранить заданную дату."""
+    field = model._meta.get_field(name)
+    auto_now_add = field.auto_now_add
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = auto_now_add
+
+
+def rebuild_derived():
+    counters.rebuild()
+    search.rebuild()
+    if settings.FOLLOW_TIMELINE:
+        timeline.rebuild()
+    fragments.invalidate()
+
+
+def add_derived(post_ids):
+    """Учитывает новые посты post_ids в производных данных.
+
+    Прибавляет их к счётчикам областей, добавляет в поисковый индекс
+    и в ленты подписчиков, не трогая остальные посты.
+    """
+    posts = list(Post.objects.filter(pk__in=post_ids).only(
+        'pk', 'text', 'group_id', 'author_id', 'pub_date'
+    ))
+    deltas = Counter()
+    for post in posts:
+        deltas.update(counters.post_scopes(post.group_id, post.author_id))
+    for scope, delta in deltas.items():
+        counters.change(scope, delta)
+    search.get_backend().bulk_index(
+        [(post.pk, post.text) for post in posts], []
+    )
+    if settings.FOLLOW_TIMELINE:
+        timeline.fan_out_many(posts)
+    fragments.invalidate(*deltas)
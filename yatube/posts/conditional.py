@@ -0,0 +1,174 @@
+"""Условные GET-запросы и заголовки кэширования лент.
+
+ETag и Last-Modified вычисляются без выборки самих постов и без рендера
+шаблона: из даты последнего поста, хранимых счётчиков и версий областей
+кэша фрагментов, из которых собрана страница (posts.fragments). Запись
+в другую группу или к другому автору их не меняет. Клиент с совпавшим
+If-None-Match получает 304 без тела.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from . import counters, fragments
+from .models import Comment, Group, Post
+from .utils import follow_posts
+
+User = get_user_model()
+
+
+def _latest(post_list):
+    # Ленты уже упорядочены от новых к старым, их порядок читает индекс
+    if not post_list.ordered:
+        post_list = post_list.order_by('-pub_date')
+    return post_list.values_list(
+        'pub_date', flat=True
+    ).first()
+
+
+def _scoped(scopes, parts, latest):
+    # Версии областей fragments меняет любая запись, которая попадает
+    # на страницу, в том числе правка поста и новый комментарий
+    modified = fragments.last_modified(*scopes)
+    return (
+        [*parts, fragments.feed_version(*scopes)],
+        modified if latest is None else max(latest, modified),
+    )
+
+
+def index_state(request):
+    return _scoped(
+        [counters.ALL_POSTS],
+        [counters.posts_count()],
+        _latest(Post.objects.all()),
+    )
+
+
+def group_state(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return None
+    return _scoped(
+        [counters.group_scope(group.pk)],
+        [group.pk, counters.group_posts_count(group)],
+        _latest(group.group_posts.all()),
+    )
+
+
+def profile_state(request, username):
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return None
+    scopes = [counters.author_scope(author.pk)]
+    if request.user.is_authenticated:
+        # Кнопка подписки зависит от подписок читателя
+        scopes.append(fragments.follow_scope(request.user.pk))
+    return _scoped(
+        scopes,
+        [author.pk, counters.author_posts_count(author)],
+        _latest(author.posts.all()),
+    )
+
+
+def follow_state(request):
+    if not request.user.is_authenticated:
+        return None
+    return _scoped(
+        fragments.follow_scopes(request.user),
+        [request.user.pk, counters.feed_posts_count(request.user)],
+        _latest(follow_posts(request.user)),
+    )
+
+
+def post_state(request, post_id):
+    post = Post.objects.filter(pk=post_id).only(
+        'pub_date', 'comments_count', 'group_id', 'author_id'
+    ).first()
+    if post is None:
+        return None
+    latest_comment = Comment.objects.filter(post_id=post_id).order_by(
+        '-created'
+    ).values_list('created', flat=True).first()
+    # Правку поста отмечает версия области автора
+    return _scoped(
+        [counters.author_scope(post.author_id)],
+        [post.comments_count],
+        max(filter(None, [post.pub_date, latest_comment])),
+    )
+
+
+def _state(request, state_func, kwargs):
+    # ETag и Last-Modified считаются по одному и тому же состоянию
+    if not hasattr(request, '_feed_state'):
+        request._feed_state = state_func(request, **kwargs)
+    return request._feed_state
+
+
+def conditional(state_func):
+    """Декоратор представления с проверкой If-None-Match/If-Modified-Since.
+
+    state_func(request, **kwargs) возвращает пару (части ключа, дата
+    последнего изменения) или None, если объекта нет или доступ закрыт:
+    тогда представление выполняется без условной проверки.
+    """
+    def etag(request, **kwargs):
+        state = _state(request, state_func, kwargs)
+        if state is None:
+            return None
+        parts, latest = state
+        # Страница авторизованного пользователя отличается от страницы
+        # гостя, поэтому пользователь входит в ETag
+        raw = '|'.join(str(part) for part in [
+            request.get_full_path(),
+            request.user.pk,
+            latest,
+            *parts,
+        ])
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def last_modified(request, **kwargs):
+        state = _state(request, state_func, kwargs)
+        if state is None:
+            return None
+        return state[1]
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def cache_policy(state_func, cache_for_guests=False):
+    """Условные GET и Cache-Control для HTML-страницы.
+
+    Гостю страница отдаётся как public: с cache_for_guests браузер
+    и прокси держат её settings.HTTP_CACHE_MAX_AGE секунд без запросов,
+    без него перепроверяют по ETag при каждом показе. Авторизованному
+    пользователю — только private, no-cache: в странице его имя и форма
+    с CSRF-токеном. Ответ всегда меняется в зависимости от Cookie,
+    то есть от входа на сайт.
+    """
+    def decorator(view):
+        conditional_view = conditional(state_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if (
+                request.method not in ('GET', 'HEAD')
+                or response.status_code not in (200, 304)
+            ):
+                return response
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            elif cache_for_guests:
+                patch_cache_control(
+                    response, public=True, max_age=settings.HTTP_CACHE_MAX_AGE
+                )
+            else:
+                patch_cache_control(response, public=True, no_cache=True)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
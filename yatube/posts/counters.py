@@ -0,0 +1,138 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Counter, Follow, Post
+
+CACHE_KEY = 'posts:count:{}'
+
+ALL_POSTS = 'posts'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def post_scopes(group_id, author_id):
+    """Области, в которые входит пост с такими группой и автором."""
+    scopes = [ALL_POSTS, author_scope(author_id)]
+    if group_id is not None:
+        scopes.append(group_scope(group_id))
+    return scopes
+
+
+def _queryset(scope):
+    kind, _, key = scope.partition(':')
+    if kind == 'group':
+        return Post.objects.filter(group_id=key)
+    if kind == 'author':
+        return Post.objects.filter(author_id=key)
+    return Post.objects.all()
+
+
+def recount(scope):
+    """Пересчитывает область по таблице постов и сохраняет результат."""
+    value = _queryset(scope).count()
+    Counter.objects.update_or_create(scope=scope, defaults={'value': value})
+    cache.delete(CACHE_KEY.format(scope))
+    return value
+
+
+def rebuild(batch_size=1000):
+    """Пересчитывает все счётчики постов и комментариев с нуля.
+
+    Возвращает число сохранённых областей.
+    """
+    values = {ALL_POSTS: Post.objects.count()}
+    scopes = (('group_id', group_scope), ('author_id', author_scope))
+    for field, scope in scopes:
+        rows = Post.objects.order_by().exclude(**{field: None}).values(
+            field
+        ).annotate(total=Count('pk')).values_list(field, 'total')
+        values.update((scope(pk), total) for pk, total in rows)
+    comments = Comment.objects.filter(post=OuterRef('pk')).order_by().values(
+        'post'
+    ).annotate(total=Count('pk')).values('total')
+    with transaction.atomic():
+        stale = list(Counter.objects.values_list('scope', flat=True))
+        Counter.objects.all().delete()
+        Counter.objects.bulk_create(
+            (Counter(scope=scope, value=value)
+             for scope, value in values.items()),
+            batch_size=batch_size
+        )
+        Post.objects.update(comments_count=Coalesce(Subquery(comments), 0))
+    cache.delete_many(
+        [CACHE_KEY.format(scope) for scope in set(stale) | set(values)]
+    )
+    return len(values)
+
+
+def change(scope, delta):
+    updated = Counter.objects.filter(scope=scope).update(
+        value=F('value') + delta
+    )
+    if not updated:
+        recount(scope)
+    cache.delete(CACHE_KEY.format(scope))
+
+
+def get_counts(scopes):
+    """Значения счётчиков: сначала из кэша, затем из таблицы счётчиков."""
+    keys = {CACHE_KEY.format(scope): scope for scope in scopes}
+    counts = {
+        keys[key]: value for key, value in cache.get_many(keys).items()
+    }
+    missing = [scope for scope in scopes if scope not in counts]
+    if missing:
+        stored = dict(
+            Counter.objects.filter(scope__in=missing).values_list(
+                'scope', 'value'
+            )
+        )
+        for scope in missing:
+            if scope not in stored:
+                stored[scope] = recount(scope)
+        cache.set_many(
+            {CACHE_KEY.format(scope): stored[scope] for scope in missing},
+            settings.COUNTERS_CACHE_TIMEOUT
+        )
+        counts.update(stored)
+    return counts
+
+
+def get_count(scope):
+    return get_counts([scope])[scope]
+
+
+def posts_count():
+    return get_count(ALL_POSTS)
+
+
+def group_posts_count(group):
+    return get_count(group_scope(group.pk))
+
+
+def author_posts_count(author):
+    return get_count(author_scope(author.pk))
+
+
+def feed_posts_count(user):
+    """Размер ленты подписок — сумма счётчиков авторов.
+
+    Материализованная лента хранит не больше FOLLOW_TIMELINE_LENGTH
+    постов, и счётчик ограничивается тем же числом.
+    """
+    author_ids = Follow.objects.filter(user=user).values_list(
+        'author_id', flat=True
+    )
+    total = sum(get_counts([author_scope(pk) for pk in author_ids]).values())
+    if settings.FOLLOW_TIMELINE:
+        return min(total, settings.FOLLOW_TIMELINE_LENGTH)
+    return total
@@ -0,0 +1,106 @@
+"""Потоковая выгрузка постов, комментариев и подписок.
+
+Строки читаются из базы через iterator() порциями по chunk_size и сразу
+превращаются в строки JSONL или CSV, поэтому память не растёт с размером
+таблицы. Формат постов совпадает с форматом manage.py import_posts.
+"""
+import csv
+import json
+import zlib
+
+from .models import Comment, Follow, Post
+
+EXPORTS = {
+    'posts': (Post, (
+        ('id', 'pk'),
+        ('text', 'text'),
+        ('author', 'author__username'),
+        ('group', 'group__slug'),
+        ('pub_date', 'pub_date'),
+        ('image', 'image'),
+        ('comments_count', 'comments_count'),
+    )),
+    'comments': (Comment, (
+        ('id', 'pk'),
+        ('post', 'post_id'),
+        ('author', 'author__username'),
+        ('text', 'text'),
+        ('created', 'created'),
+    )),
+    'follows': (Follow, (
+        ('user', 'user__username'),
+        ('author', 'author__username'),
+    )),
+}
+
+FORMATS = ('jsonl', 'csv')
+
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def _value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def rows(kind, queryset=None, chunk_size=2000):
+    """Строки выгрузки как словари; queryset сужает набор объектов."""
+    model, columns = EXPORTS[kind]
+    if queryset is None:
+        queryset = model.objects.all()
+    names = [name for name, _ in columns]
+    values = queryset.order_by('pk').values_list(
+        *[lookup for _, lookup in columns]
+    ).iterator(chunk_size=chunk_size)
+    for row in values:
+        yield dict(zip(names, map(_value, row)))
+
+
+class _Line:
+    """Файл для csv.writer, который отдаёт записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def lines(kind, file_format, queryset=None, chunk_size=2000):
+    """Текстовые строки выгрузки в формате jsonl или csv."""
+    if file_format == 'jsonl':
+        for row in rows(kind, queryset, chunk_size):
+            yield json.dumps(row, ensure_ascii=False) + '\n'
+        return
+    writer = csv.writer(_Line())
+    yield writer.writerow([name for name, _ in EXPORTS[kind][1]])
+    for row in rows(kind, queryset, chunk_size):
+        yield writer.writerow(row.values())
+
+
+def encoded(chunks, compress=False, buffer_size=64 * 1024):
+    """Байты выгрузки, при compress — в формате gzip.
+
+    Короткие строки собираются в блоки около buffer_size байт, чтобы
+    не отправлять клиенту по строке за раз.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    buffer = []
+    size = 0
+    for chunk in chunks:
+        data = chunk.encode()
+        buffer.append(data)
+        size += len(data)
+        if size >= buffer_size:
+            block = b''.join(buffer)
+            buffer, size = [], 0
+            if compressor:
+                block = compressor.compress(block)
+            if block:
+                yield block
+    block = b''.join(buffer)
+    if compressor:
+        block = compressor.compress(block) + compressor.flush()
+    if block:
+        yield block
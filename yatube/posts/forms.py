@@ -1,9 +1,25 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import images
 from .models import Comment, Post
 
 
-class PostForm(forms.ModelForm):
+class ImageUploadMixin:
+    """Пропускает новую картинку поста через posts.images.process."""
+
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            image, width, height = images.process(image)
+            self.instance.image_width = width
+            self.instance.image_height = height
+        elif not image:
+            self.instance.image_width = self.instance.image_height = None
+        return image
+
+
+class PostForm(ImageUploadMixin, forms.ModelForm):
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
@@ -0,0 +1,80 @@
+"""Версии кэша фрагментов лент по областям.
+
+Ключ фрагмента включает версии областей, из которых собрана лента:
+всех постов, группы, автора или подписок пользователя (области
+posts.counters и follow_scope). Запись увеличивает версии только
+затронутых областей, поэтому комментарий к посту сбрасывает главную,
+ленту группы и автора этого поста, но не ленты других групп и авторов.
+Общую версию GLOBAL, которая входит в каждый ключ, увеличивают редкие
+массовые изменения. Рядом хранится время последней записи в каждую
+область — по нему страницы выставляют Last-Modified.
+"""
+import time
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import counters
+from .models import Follow
+
+GLOBAL = 'all'
+VERSION_KEY = 'posts:feed-version:{}'
+MODIFIED_KEY = 'posts:feed-modified:{}'
+
+
+def follow_scope(user_id):
+    return f'follow:{user_id}'
+
+
+def follow_scopes(user):
+    """Области ленты подписок: сами подписки и посты каждого автора."""
+    authors = Follow.objects.filter(user=user).values_list(
+        'author_id', flat=True
+    )
+    return [follow_scope(user.pk)] + [
+        counters.author_scope(author_id) for author_id in authors
+    ]
+
+
+def _initial_version():
+    # Версия по времени не повторяет старую, если ключ был вытеснен
+    return int(time.time() * 1000)
+
+
+def _values(template, scopes, default):
+    keys = [template.format(scope) for scope in (GLOBAL, *scopes)]
+    values = cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    for key in missing:
+        cache.add(key, default(), None)
+    if missing:
+        values.update(cache.get_many(missing))
+    return [values.get(key) for key in keys]
+
+
+def feed_version(*scopes):
+    """Версия фрагментов ленты из областей scopes для ключа кэша."""
+    return '.'.join(
+        str(version)
+        for version in _values(VERSION_KEY, scopes, _initial_version)
+    )
+
+
+def last_modified(*scopes):
+    """Время последней записи в области; если оно забыто — текущее."""
+    return max(filter(None, _values(MODIFIED_KEY, scopes, timezone.now)))
+
+
+def invalidate(*scopes):
+    """Сбрасывает фрагменты областей scopes, без них — все фрагменты."""
+    scopes = set(scopes) or {GLOBAL}
+    for scope in scopes:
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+    now = timezone.now()
+    cache.set_many(
+        {MODIFIED_KEY.format(scope): now for scope in scopes}, None
+    )
@@ -0,0 +1,134 @@
+"""Обработка картинок постов при загрузке.
+
+process() проверяет картинку, уменьшает её до IMAGE_MAX_SIZE точек по
+большей стороне, поворачивает по метке ориентации EXIF и перекодирует
+без метаданных в IMAGE_FORMAT с качеством IMAGE_QUALITY. Загрузки
+больше FILE_UPLOAD_MAX_MEMORY_SIZE Django пишет во временный файл,
+результат тоже пишется во временный файл, а JPEG декодируется сразу
+в уменьшенном размере, так что фотография не держится в памяти
+целиком. GIF в допустимых размерах сохраняются как есть, чтобы не
+терять анимацию.
+"""
+import os
+import tempfile
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps, features
+
+Processed = namedtuple('Processed', 'file width height')
+
+EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp'}
+
+
+def _save_options(image_format):
+    if image_format == 'JPEG':
+        return {
+            'quality': settings.IMAGE_QUALITY,
+            'optimize': True,
+            'progressive': True,
+        }
+    if image_format == 'WEBP':
+        return {'quality': settings.IMAGE_QUALITY, 'method': 6}
+    return {'optimize': True}
+
+
+def output_format(has_alpha):
+    """Формат результата: прозрачным картинкам JPEG не подходит."""
+    image_format = settings.IMAGE_FORMAT
+    if image_format == 'WEBP' and not features.check('webp'):
+        # Pillow собран без libwebp
+        image_format = 'JPEG'
+    if image_format == 'JPEG' and has_alpha:
+        image_format = 'PNG'
+    return image_format
+
+
+def _open(upload):
+    if upload.size > settings.IMAGE_MAX_UPLOAD_SIZE:
+        raise ValidationError(
+            'Файл больше %(limit)s',
+            code='file_too_large',
+            params={'limit': filesizeformat(settings.IMAGE_MAX_UPLOAD_SIZE)},
+        )
+    upload.seek(0)
+    try:
+        # Image.open читает только заголовок, пиксели ещё не декодированы
+        image = Image.open(upload)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError(
+            'Не удалось прочитать картинку', code='invalid_image'
+        )
+    width, height = image.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка слишком большая: %(width)s×%(height)s точек',
+            code='too_many_pixels',
+            params={'width': width, 'height': height},
+        )
+    return image
+
+
+def _normalize_mode(image):
+    """RGB, L или RGBA с действительно прозрачными точками."""
+    if image.mode in ('P', 'PA', 'LA') or 'transparency' in image.info:
+        image = image.convert('RGBA')
+    elif image.mode not in ('RGB', 'L', 'RGBA'):
+        image = image.convert('RGB')
+    if image.mode == 'RGBA' and image.getextrema()[3][0] == 255:
+        image = image.convert('RGB')
+    return image
+
+
+def process(upload):
+    """Готовит загруженную картинку к сохранению.
+
+    Возвращает Processed с файлом для ImageField и размерами картинки;
+    ошибки проверки — ValidationError.
+    """
+    image = _open(upload)
+    max_size = (settings.IMAGE_MAX_SIZE, settings.IMAGE_MAX_SIZE)
+    if image.format == 'GIF' and (
+        image.width <= max_size[0] and image.height <= max_size[1]
+    ):
+        upload.seek(0)
+        return Processed(upload, image.width, image.height)
+    if getattr(image, 'is_animated', False):
+        raise ValidationError(
+            'Анимация больше %(size)s точек по стороне',
+            code='animation_too_large',
+            params={'size': settings.IMAGE_MAX_SIZE},
+        )
+    try:
+        # JPEG декодируется сразу с уменьшением в 2–8 раз
+        image.draft('RGB', max_size)
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(max_size, Image.LANCZOS)
+        image = _normalize_mode(image)
+    except (OSError, ValueError):
+        raise ValidationError(
+            'Не удалось прочитать картинку', code='invalid_image'
+        )
+    image_format = output_format(image.mode == 'RGBA')
+    # EXIF и прочие метаданные не переносятся, цветовой профиль нужен
+    # для правильных цветов
+    image.info = {
+        key: value for key, value in image.info.items()
+        if key == 'icc_profile'
+    }
+    name = (
+        os.path.splitext(os.path.basename(upload.name))[0]
+        + EXTENSIONS[image_format]
+    )
+    # Безымянный временный файл удаляется сам, когда его закроют
+    output = tempfile.TemporaryFile(dir=settings.FILE_UPLOAD_TEMP_DIR)
+    image.save(output, image_format, **_save_options(image_format))
+    size = output.tell()
+    output.seek(0)
+    return Processed(
+        UploadedFile(output, name, Image.MIME[image_format], size),
+        image.width, image.height,
+    )
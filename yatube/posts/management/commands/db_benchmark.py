@@ -0,0 +1,143 @@
+import random
+import time
+from multiprocessing import Pool
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+BENCHMARK_USERNAME = 'db-benchmark'
+
+
+def _work(options):
+    """Смешанная нагрузка одного процесса: чтение лент и комментарии."""
+    duration, write_ratio, post_ids, user_id, seed = options
+    rnd = random.Random(seed)
+    reads, writes = [], []
+    errors = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            if rnd.random() < write_ratio:
+                Comment.objects.create(
+                    post_id=rnd.choice(post_ids),
+                    author_id=user_id,
+                    text='Комментарий нагрузочного теста',
+                )
+                writes.append(time.perf_counter() - started)
+            else:
+                list(Post.objects.for_feed()[:settings.NUM_OF_PAGES])
+                list(Comment.objects.filter(
+                    post_id=rnd.choice(post_ids)
+                ).select_related('author')[:settings.COMMENTS_PER_PAGE])
+                reads.append(time.perf_counter() - started)
+        except OperationalError:
+            # «database is locked»: запись не дождалась блокировки
+            errors += 1
+    connection.close()
+    return reads, writes, errors
+
+
+def _percentile(values, share):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает базу параллельным чтением лент и записью комментариев '
+        'и выводит пропускную способность и задержки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=4,
+            help='Число параллельных процессов',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10,
+            help='Сколько секунд длится каждый прогон',
+        )
+        parser.add_argument(
+            '--write-ratio',
+            type=float,
+            default=0.2,
+            help='Доля операций записи',
+        )
+        parser.add_argument(
+            '--journal-mode',
+            nargs='+',
+            choices=('delete', 'wal'),
+            help='Прогнать нагрузку в каждом режиме журнала SQLite '
+                 '(режим сохраняется в файле базы)',
+        )
+
+    def handle(self, *args, **options):
+        post_ids = list(Post.objects.values_list('pk', flat=True)[:1000])
+        if not post_ids:
+            raise CommandError(
+                'В базе нет постов: загрузите их командой import_posts'
+            )
+        user, _ = User.objects.get_or_create(username=BENCHMARK_USERNAME)
+        profile = (
+            f'профиль {settings.DB_PROFILE}, '
+            f'CONN_MAX_AGE={connection.settings_dict["CONN_MAX_AGE"]}'
+        )
+        try:
+            for journal_mode in options['journal_mode'] or [None]:
+                if journal_mode:
+                    if connection.vendor != 'sqlite':
+                        raise CommandError('--journal-mode только для SQLite')
+                    with connection.cursor() as cursor:
+                        cursor.execute(f'PRAGMA journal_mode = {journal_mode}')
+                self.report(
+                    profile,
+                    self.run(options, post_ids, user.pk),
+                    options['duration'],
+                )
+        finally:
+            Comment.objects.filter(author=user).delete()
+            user.delete()
+
+    def run(self, options, post_ids, user_id):
+        tasks = [
+            (options['duration'], options['write_ratio'], post_ids,
+             user_id, seed)
+            for seed in range(options['processes'])
+        ]
+        if options['processes'] == 1:
+            return [_work(tasks[0])]
+        # Дочерние процессы не должны делить соединение с родителем
+        connections.close_all()
+        with Pool(options['processes']) as pool:
+            return pool.map(_work, tasks)
+
+    def report(self, profile, results, duration):
+        reads = [value for result in results for value in result[0]]
+        writes = [value for result in results for value in result[1]]
+        errors = sum(result[2] for result in results)
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                profile += f', журнал {cursor.fetchone()[0]}'
+        self.stdout.write(self.style.MIGRATE_HEADING(profile))
+        for name, values in (('чтение', reads), ('запись', writes)):
+            self.stdout.write(
+                f'  {name}: {len(values) / max(duration, 1e-6):.0f} оп/с, '
+                f'p50 {_percentile(values, 0.5) * 1000:.1f} мс, '
+                f'p95 {_percentile(values, 0.95) * 1000:.1f} мс, '
+                f'p99 {_percentile(values, 0.99) * 1000:.1f} мс'
+            )
+        self.stdout.write(f'  ошибок блокировки: {errors}')
@@ -0,0 +1,131 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from posts.models import Follow, Group, Post
+from posts.utils import follow_posts
+
+User = get_user_model()
+
+
+def feed_cases(page):
+    """Запросы, которые выполняют страницы ленты, на самых больших
+    группе, авторе, посте и подписчике."""
+    bottom = (page - 1) * settings.NUM_OF_PAGES
+    top = bottom + settings.NUM_OF_PAGES
+    cases = [('index', Post.objects.for_feed()[bottom:top])]
+    group = Group.objects.annotate(
+        posts=Count('group_posts')
+    ).order_by('-posts').first()
+    if group is not None:
+        cases.append((
+            'group_posts', group.group_posts.for_feed()[bottom:top]
+        ))
+    author = User.objects.annotate(
+        posts_number=Count('posts')
+    ).order_by('-posts_number').first()
+    follower = User.objects.annotate(
+        follows=Count('follower')
+    ).order_by('-follows').first()
+    if author is not None:
+        cases.append(('profile', author.posts.for_feed()[bottom:top]))
+        cases.append((
+            'profile_following',
+            Follow.objects.filter(user=follower, author=author)[:1],
+        ))
+    post = Post.objects.order_by('-comments_count').first()
+    if post is not None:
+        cases.append((
+            'post_detail_comments',
+            post.comments.select_related('author').order_by('created', 'pk'),
+        ))
+    if follower is not None:
+        cases.append(
+            ('follow_index', follow_posts(follower)[bottom:top])
+        )
+    return cases
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит план (EXPLAIN) и время запросов страниц ленты; '
+        'с --save и --compare сравнивает замеры до и после миграции'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Сколько раз выполнять каждый запрос',
+        )
+        parser.add_argument(
+            '--page',
+            type=int,
+            default=1,
+            help='Номер страницы ленты',
+        )
+        parser.add_argument(
+            '--save',
+            metavar='FILE',
+            help='Записать результаты в JSON-файл',
+        )
+        parser.add_argument(
+            '--compare',
+            metavar='FILE',
+            help='Сравнить с результатами из JSON-файла',
+        )
+
+    def handle(self, *args, **options):
+        before = {}
+        if options['compare']:
+            try:
+                with open(options['compare']) as file:
+                    before = json.load(file)
+            except (OSError, ValueError) as error:
+                raise CommandError(f'Не удалось прочитать замеры: {error}')
+        results = {}
+        for name, queryset in feed_cases(options['page']):
+            results[name] = self.measure(queryset, options['repeat'])
+            self.report(name, results[name], before.get(name))
+        if options['save']:
+            with open(options['save'], 'w') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+
+    def measure(self, queryset, repeat):
+        timings = []
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return {
+            'plan': queryset.explain().splitlines(),
+            'median_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 3),
+        }
+
+    def report(self, name, result, before):
+        line = (
+            f'{name}: медиана {result["median_ms"]} мс, '
+            f'p95 {result["p95_ms"]} мс'
+        )
+        if before is not None:
+            line += (
+                f' (было {before["median_ms"]} мс, '
+                f'p95 {before["p95_ms"]} мс)'
+            )
+        self.stdout.write(self.style.MIGRATE_HEADING(line))
+        if before is not None and before['plan'] != result['plan']:
+            for row in before['plan']:
+                self.stdout.write(f'  - {row}')
+            for row in result['plan']:
+                self.stdout.write(f'  + {row}')
+        else:
+            for row in result['plan']:
+                self.stdout.write(f'    {row}')
@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает посты, комментарии или подписки в JSONL/CSV '
+        'с постоянным расходом памяти'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(export.EXPORTS))
+        parser.add_argument(
+            '--format',
+            choices=export.FORMATS,
+            default='jsonl',
+            help='Формат строк выгрузки',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл выгрузки; без него строки выводятся в stdout',
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Сжать файл выгрузки в gzip',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Сколько строк читать из базы за раз',
+        )
+
+    def handle(self, *args, **options):
+        if options['gzip'] and not options['output']:
+            raise CommandError('Для --gzip нужен файл --output')
+        started = time.monotonic()
+        lines = export.lines(
+            options['kind'], options['format'],
+            chunk_size=options['chunk_size'],
+        )
+        count = 0
+
+        def counted(lines):
+            nonlocal count
+            for line in lines:
+                count += 1
+                yield line
+
+        if options['output']:
+            with open(options['output'], 'wb') as file:
+                for block in export.encoded(counted(lines), options['gzip']):
+                    file.write(block)
+        else:
+            for line in counted(lines):
+                self.stdout.write(line, ending='')
+        if options['format'] == 'csv':
+            count -= 1
+        self.stderr.write(self.style.SUCCESS(
+            f'Выгружено строк: {count}, '
+            f'за {time.monotonic() - started:.1f} с'
+        ))
@@ -0,0 +1,64 @@
+import time
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def _generate(name):
+    try:
+        return name, thumbnails.generate(name), None
+    except Exception as error:
+        return name, 0, str(error)
+
+
+class Command(BaseCommand):
+    help = 'Заранее создаёт превью для картинок всех постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Число процессов, декодирующих картинки параллельно',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=20,
+            help='Сколько картинок отдавать процессу за раз',
+        )
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').order_by().values_list(
+            'image', flat=True
+        ).distinct()
+        started = time.monotonic()
+        images = created = 0
+        if options['processes'] > 1:
+            names = list(names.iterator())
+            # Дочерние процессы не должны делить соединение с родителем
+            connections.close_all()
+            with Pool(options['processes']) as pool:
+                results = pool.imap_unordered(
+                    _generate, names, chunksize=options['chunk_size']
+                )
+                for result in results:
+                    images, created = self.report(images, created, *result)
+        else:
+            for name in names.iterator():
+                images, created = self.report(
+                    images, created, *_generate(name)
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинок: {images}, превью: {created}, '
+            f'за {time.monotonic() - started:.1f} с'
+        ))
+
+    def report(self, images, created, name, count, error):
+        if error:
+            self.stderr.write(f'{name}: {error}')
+        return images + 1, created + count
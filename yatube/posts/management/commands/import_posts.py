@@ -0,0 +1,254 @@
+import csv
+import json
+import os
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import images
+from posts.bulk import add_derived, keep_field_value
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class RowError(Exception):
+    pass
+
+
+def read_jsonl(file):
+    for line_number, line in enumerate(file, 1):
+        if line.strip():
+            try:
+                yield line_number, json.loads(line)
+            except ValueError as error:
+                yield line_number, error
+
+
+def read_csv(file):
+    # Первая строка CSV — заголовок, поэтому данные начинаются со второй
+    for line_number, row in enumerate(csv.DictReader(file), 2):
+        yield line_number, row
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты из файлов JSONL или CSV пачками через bulk_create; '
+        'поля: text, author, group, pub_date, image'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help='Файлы .jsonl или .csv')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько постов вставлять в одной транзакции',
+        )
+        parser.add_argument(
+            '--keep-dates',
+            action='store_true',
+            help='Брать pub_date из файла вместо текущего времени',
+        )
+        parser.add_argument(
+            '--create-missing',
+            action='store_true',
+            help='Создавать неизвестных авторов и группы',
+        )
+        parser.add_argument(
+            '--images-dir',
+            help='Папка, относительно которой указаны картинки постов',
+        )
+        parser.add_argument(
+            '--no-rebuild',
+            action='store_true',
+            help=(
+                'Не обновлять счётчики, поиск и ленты для загруженных постов'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.authors = {}
+        self.groups = {}
+        self.imported = self.skipped = 0
+        self.started = time.monotonic()
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+        with ExitStack() as stack:
+            if options['keep_dates']:
+                stack.enter_context(keep_field_value(Post, 'pub_date'))
+            for path in options['files']:
+                self.import_file(path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено постов: {self.imported}, пропущено: {self.skipped}, '
+            f'{self.rate():.0f} постов/с'
+        ))
+        if self.imported:
+            self.stdout.write(
+                'Превью картинок создаст manage.py generate_thumbnails'
+            )
+
+    def import_file(self, path):
+        if path.endswith('.csv'):
+            reader = read_csv
+        elif path.endswith(('.jsonl', '.json')):
+            reader = read_jsonl
+        else:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        try:
+            file = open(path, newline='', encoding='utf-8')
+        except OSError as error:
+            raise CommandError(f'Не удалось открыть {path}: {error}')
+        with file:
+            batch = []
+            for line_number, record in reader(file):
+                batch.append((line_number, record))
+                if len(batch) == self.options['batch_size']:
+                    self.import_batch(path, batch)
+                    batch = []
+            if batch:
+                self.import_batch(path, batch)
+
+    def import_batch(self, path, batch):
+        records = [
+            (line_number, record) for line_number, record in batch
+            if self.check_record(path, line_number, record)
+        ]
+        self.resolve(
+            User, self.authors, 'username',
+            {record['author'] for _, record in records},
+        )
+        self.resolve(
+            Group, self.groups, 'slug',
+            {record['group'] for _, record in records if record.get('group')},
+            titles={
+                record['group']: record.get('group_title') or record['group']
+                for _, record in records if record.get('group')
+            },
+        )
+        posts = []
+        for line_number, record in records:
+            try:
+                posts.append(self.build_post(record))
+            except RowError as error:
+                self.skip(path, line_number, error)
+        with transaction.atomic():
+            last = Post.objects.order_by('-pk').values_list(
+                'pk', flat=True
+            ).first()
+            Post.objects.bulk_create(posts)
+            if posts and not self.options['no_rebuild']:
+                add_derived(self.created_ids(posts, last))
+        self.imported += len(posts)
+        self.stdout.write(
+            f'{path}: загружено {self.imported}, {self.rate():.0f} постов/с'
+        )
+
+    def check_record(self, path, line_number, record):
+        if isinstance(record, Exception):
+            self.skip(path, line_number, record)
+            return False
+        if not isinstance(record, dict):
+            self.skip(path, line_number, 'строка не является объектом JSON')
+            return False
+        if not record.get('text') or not record.get('author'):
+            self.skip(path, line_number, 'нет полей text или author')
+            return False
+        return True
+
+    def created_ids(self, posts, last):
+        """id вставленных постов.
+
+        SQLite не возвращает id из bulk_create. Чужая вставка между
+        чтением last и bulk_create в SQLite не зафиксируется: этому
+        мешает читающая транзакция, или она сама получит ошибку
+        блокировки.
+        """
+        if all(post.pk is not None for post in posts):
+            return [post.pk for post in posts]
+        return Post.objects.filter(pk__gt=last or 0).values_list(
+            'pk', flat=True
+        )
+
+    def resolve(self, model, known, field, keys, titles=None):
+        """Дополняет карту ключ -> id одним запросом на пачку."""
+        missing = keys - known.keys()
+        if not missing:
+            return
+        known.update(model.objects.filter(
+            **{f'{field}__in': missing}
+        ).values_list(field, 'pk'))
+        missing -= known.keys()
+        if not missing or not self.options['create_missing']:
+            return
+        if model is User:
+            objects = [User(username=name) for name in missing]
+            for user in objects:
+                user.set_unusable_password()
+        else:
+            objects = [
+                Group(slug=slug, title=titles[slug][:200], description='')
+                for slug in missing
+            ]
+        model.objects.bulk_create(objects)
+        known.update(model.objects.filter(
+            **{f'{field}__in': missing}
+        ).values_list(field, 'pk'))
+
+    def build_post(self, record):
+        if record['author'] not in self.authors:
+            raise RowError(f'нет автора {record["author"]}')
+        post = Post(
+            text=record['text'], author_id=self.authors[record['author']]
+        )
+        if record.get('group'):
+            if record['group'] not in self.groups:
+                raise RowError(f'нет группы {record["group"]}')
+            post.group_id = self.groups[record['group']]
+        if self.options['keep_dates']:
+            pub_date = parse_datetime(record.get('pub_date') or '')
+            if pub_date is None:
+                raise RowError('нет даты pub_date или она некорректна')
+            if settings.USE_TZ and timezone.is_naive(pub_date):
+                pub_date = timezone.make_aware(pub_date)
+            post.pub_date = pub_date
+        if record.get('image') and self.options['images_dir']:
+            post.image, post.image_width, post.image_height = (
+                self.save_image(record['image'])
+            )
+        return post
+
+    def save_image(self, name):
+        """Обрабатывает картинку как при загрузке и сохраняет её."""
+        path = os.path.join(self.options['images_dir'], name)
+        try:
+            with open(path, 'rb') as file:
+                result = images.process(File(file, os.path.basename(name)))
+                with result.file:
+                    saved = Post.image.field.storage.save(
+                        Post.image.field.generate_filename(
+                            None, result.file.name
+                        ),
+                        result.file,
+                    )
+        except OSError as error:
+            raise RowError(f'картинка {name}: {error}')
+        except ValidationError as error:
+            raise RowError(f'картинка {name}: {"; ".join(error.messages)}')
+        return saved, result.width, result.height
+
+    def skip(self, path, line_number, reason):
+        self.skipped += 1
+        self.stderr.write(f'{path}:{line_number}: {reason}')
+
+    def rate(self):
+        return self.imported / max(time.monotonic() - self.started, 1e-6)
@@ -0,0 +1,358 @@
+import json
+import random
+import threading
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+)
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+from .seed_data import PREFIX
+
+User = get_user_model()
+
+# Доли запросов к страницам по умолчанию
+DEFAULT_MIX = {
+    'index': 30,
+    'group_list': 10,
+    'profile': 15,
+    'post_detail': 25,
+    'follow_index': 10,
+    'add_comment': 10,
+}
+
+PERCENTILES = (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))
+
+
+def percentile(values, share):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+def login_session(user):
+    """Ключ сессии, в которой пользователь уже вошёл на сайт."""
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return session.session_key
+
+
+class InProcessClient:
+    """Запросы через тестовый клиент Django с подсчётом SQL-запросов."""
+
+    def __init__(self, session_key):
+        self.client = Client()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+
+    def request(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            if method == 'POST':
+                response = self.client.post(url, data)
+            else:
+                response = self.client.get(url)
+        return response.status_code, len(queries)
+
+
+class HttpClient:
+    """Запросы к запущенному серверу; число SQL-запросов неизвестно."""
+
+    def __init__(self, session_key, server):
+        import requests
+
+        self.server = server.rstrip('/')
+        self.session = requests.Session()
+        self.session.cookies.set(settings.SESSION_COOKIE_NAME, session_key)
+
+    def request(self, method, url, data=None):
+        if method == 'POST':
+            token = self.session.cookies.get(settings.CSRF_COOKIE_NAME)
+            if token is None:
+                # Страница с формой выставляет cookie с CSRF-токеном
+                self.session.get(self.server + reverse('posts:post_create'))
+                token = self.session.cookies.get(settings.CSRF_COOKIE_NAME)
+            response = self.session.post(
+                self.server + url,
+                data={**data, 'csrfmiddlewaretoken': token},
+                allow_redirects=False,
+            )
+        else:
+            response = self.session.get(self.server + url)
+        return response.status_code, None
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает страницы постов параллельными клиентами и выводит '
+        'задержки p50/p95/p99, SQL-запросы на страницу и пропускную '
+        'способность; данные создаёт manage.py seed_data'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clients', type=int, default=8,
+            help='Число параллельных клиентов',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=1000,
+            help='Сколько запросов выполнить всего',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=50,
+            help='Сколько первых запросов не учитывать',
+        )
+        parser.add_argument(
+            '--mix',
+            help='Доли страниц, например index=50,post_detail=50',
+        )
+        parser.add_argument(
+            '--server',
+            help='Адрес запущенного сервера; без него запросы идут '
+                 'через тестовый клиент Django в этом процессе',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--save', metavar='FILE',
+            help='Записать результаты в JSON-файл',
+        )
+        parser.add_argument(
+            '--compare', metavar='FILE',
+            help='Сравнить с результатами из JSON-файла и завершиться '
+                 'с ошибкой, если страницы стали медленнее',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимый рост p95 при сравнении (0.2 — на 20%%)',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.mix = self.parse_mix(options['mix'])
+        self.load_targets()
+        sessions = [
+            login_session(user) for user in self.users[:options['clients']]
+        ]
+        self.lock = threading.Lock()
+        self.remaining = options['warmup'] + options['requests']
+        self.measured_from = None
+        self.results = {name: [] for name in self.mix}
+        try:
+            if options['clients'] == 1:
+                self.run_client(0, sessions[0])
+            else:
+                threads = [
+                    threading.Thread(
+                        target=self.run_client, args=(number, session)
+                    )
+                    for number, session in enumerate(sessions)
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            elapsed = time.monotonic() - (self.measured_from or 0)
+        finally:
+            engine = import_module(settings.SESSION_ENGINE)
+            for session_key in sessions:
+                engine.SessionStore(session_key).delete()
+        summary = self.summarize(elapsed)
+        self.report(summary)
+        if options['save']:
+            with open(options['save'], 'w') as file:
+                json.dump(summary, file, ensure_ascii=False, indent=2)
+        if options['compare']:
+            self.compare(summary)
+
+    def parse_mix(self, mix):
+        if not mix:
+            return dict(DEFAULT_MIX)
+        weights = {}
+        for item in mix.split(','):
+            name, _, weight = item.partition('=')
+            if name not in DEFAULT_MIX:
+                raise CommandError(f'Неизвестная страница в --mix: {name}')
+            try:
+                weights[name] = float(weight)
+            except ValueError:
+                raise CommandError(f'Некорректная доля в --mix: {item}')
+        return weights
+
+    def load_targets(self):
+        self.users = list(User.objects.filter(
+            username__startswith=PREFIX
+        ).order_by('pk')[:max(self.options['clients'], 1000)])
+        if len(self.users) < self.options['clients']:
+            raise CommandError(
+                'Недостаточно пользователей: выполните manage.py seed_data'
+            )
+        self.usernames = [user.username for user in self.users]
+        self.groups = list(Group.objects.filter(
+            slug__startswith=PREFIX
+        ).values_list('slug', flat=True))
+        # Чаще открывают свежие посты, поэтому берутся последние
+        self.posts = list(Post.objects.filter(
+            author__username__startswith=PREFIX
+        ).order_by('-pub_date').values_list('pk', flat=True)[:1000])
+        if not self.posts or not self.groups:
+            raise CommandError(
+                'Нет постов или групп: выполните manage.py seed_data'
+            )
+
+    def target(self, name, rnd):
+        """Метод, адрес и данные запроса к странице."""
+        if name == 'index':
+            page = rnd.choice((1, 1, 1, 2, 3, 10))
+            return 'GET', f'{reverse("posts:index")}?page={page}', None
+        if name == 'group_list':
+            return 'GET', reverse(
+                'posts:group_list', kwargs={'slug': rnd.choice(self.groups)}
+            ), None
+        if name == 'profile':
+            return 'GET', reverse(
+                'posts:profile',
+                kwargs={'username': rnd.choice(self.usernames)},
+            ), None
+        if name == 'post_detail':
+            return 'GET', reverse(
+                'posts:post_detail', kwargs={'post_id': rnd.choice(self.posts)}
+            ), None
+        if name == 'follow_index':
+            return 'GET', reverse('posts:follow_index'), None
+        return 'POST', reverse(
+            'posts:add_comment', kwargs={'post_id': rnd.choice(self.posts)}
+        ), {'text': 'Комментарий нагрузочного теста'}
+
+    def take(self):
+        """Номер следующего запроса или None, если запросы кончились."""
+        with self.lock:
+            if self.remaining <= 0:
+                return None
+            self.remaining -= 1
+            if (
+                self.measured_from is None
+                and self.remaining < self.options['requests']
+            ):
+                # Разогрев закончился: отсюда считается пропускная
+                # способность
+                self.measured_from = time.monotonic()
+            return self.remaining
+
+    def run_client(self, number, session_key):
+        rnd = random.Random(f'{self.options["seed"]}-{number}')
+        if self.options['server']:
+            client = HttpClient(session_key, self.options['server'])
+        else:
+            client = InProcessClient(session_key)
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        try:
+            while True:
+                remaining = self.take()
+                if remaining is None:
+                    break
+                name = rnd.choices(names, weights)[0]
+                method, url, data = self.target(name, rnd)
+                started = time.perf_counter()
+                try:
+                    status, queries = client.request(method, url, data)
+                except Exception as error:
+                    status, queries = repr(error), None
+                latency = time.perf_counter() - started
+                if remaining < self.options['requests']:
+                    with self.lock:
+                        self.results[name].append(
+                            (latency, queries, status)
+                        )
+        finally:
+            connection.close()
+
+    def summarize(self, elapsed):
+        summary = {'throughput': 0, 'pages': {}}
+        total = 0
+        for name, results in self.results.items():
+            if not results:
+                continue
+            total += len(results)
+            latencies = [latency for latency, _, _ in results]
+            queries = [count for _, count, _ in results if count is not None]
+            expected = 302 if name == 'add_comment' else 200
+            summary['pages'][name] = {
+                'requests': len(results),
+                **{
+                    label: round(percentile(latencies, share) * 1000, 2)
+                    for label, share in PERCENTILES
+                },
+                'queries': (
+                    round(sum(queries) / len(queries), 1) if queries
+                    else None
+                ),
+                'errors': sum(
+                    1 for _, _, status in results if status != expected
+                ),
+            }
+        summary['throughput'] = round(total / max(elapsed, 1e-6), 1)
+        return summary
+
+    def report(self, summary):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{"страница":<14}{"запросов":>9}{"p50, мс":>10}{"p95, мс":>10}'
+            f'{"p99, мс":>10}{"SQL":>7}{"ошибок":>8}'
+        ))
+        for name, page in summary['pages'].items():
+            queries = '-' if page['queries'] is None else page['queries']
+            self.stdout.write(
+                f'{name:<14}{page["requests"]:>9}{page["p50"]:>10}'
+                f'{page["p95"]:>10}{page["p99"]:>10}{queries:>7}'
+                f'{page["errors"]:>8}'
+            )
+        self.stdout.write(
+            f'Пропускная способность: {summary["throughput"]} запросов/с'
+        )
+
+    def compare(self, summary):
+        try:
+            with open(self.options['compare']) as file:
+                baseline = json.load(file)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Не удалось прочитать замеры: {error}')
+        regressions = []
+        for name, page in summary['pages'].items():
+            before = baseline['pages'].get(name)
+            if before is None:
+                continue
+            limit = before['p95'] * (1 + self.options['tolerance'])
+            if page['p95'] > limit:
+                regressions.append(
+                    f'{name}: p95 {before["p95"]} -> {page["p95"]} мс'
+                )
+            if (
+                page['queries'] is not None
+                and before['queries'] is not None
+                and page['queries'] > before['queries']
+            ):
+                regressions.append(
+                    f'{name}: SQL-запросов {before["queries"]} -> '
+                    f'{page["queries"]}'
+                )
+        self.stdout.write(
+            f'Было: {baseline["throughput"]} запросов/с, '
+            f'стало: {summary["throughput"]} запросов/с'
+        )
+        if regressions:
+            raise CommandError(
+                'Страницы стали медленнее:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
@@ -0,0 +1,148 @@
+from datetime import datetime, time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from posts import moderation
+from posts.models import Comment, Group, Post, User
+
+OPERATIONS = ('move-posts', 'delete-posts', 'delete-comments')
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит посты между группами или удаляет посты и комментарии '
+        'пачками, отбирая их по автору, группе и датам'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('operation', choices=OPERATIONS)
+        parser.add_argument(
+            '--author', help='Имя автора постов или комментариев',
+        )
+        parser.add_argument(
+            '--group',
+            help='Адрес (slug) группы постов; для delete-comments — '
+                 'группы постов, под которыми комментарии',
+        )
+        parser.add_argument(
+            '--post', type=int, help='id поста, комментарии которого удалить',
+        )
+        parser.add_argument(
+            '--since', help='Дата или время, с которых брать записи',
+        )
+        parser.add_argument(
+            '--until', help='Дата или время, до которых брать записи',
+        )
+        parser.add_argument(
+            '--to-group',
+            help='Адрес группы для move-posts; без него посты '
+                 'убираются из групп',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=moderation.BATCH_SIZE,
+            help='Сколько записей обрабатывать в одной транзакции',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, сколько записей будет затронуто',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+        operation = options['operation']
+        if operation != 'delete-comments' and options['post']:
+            raise CommandError('--post применяется только в delete-comments')
+        if operation != 'move-posts' and options['to_group']:
+            raise CommandError('--to-group применяется только в move-posts')
+        self.applied = []
+        if operation == 'delete-comments':
+            queryset = self.filter(Comment.objects.all(), 'created', 'post__')
+            if options['post']:
+                queryset = queryset.filter(post_id=options['post'])
+                self.applied.append('post')
+        else:
+            queryset = self.filter(Post.objects.all(), 'pub_date')
+        if not self.applied:
+            raise CommandError('Укажите хотя бы одно условие отбора')
+        count = queryset.count()
+        if options['dry_run']:
+            self.stdout.write(f'Будет затронуто записей: {count}')
+            return
+        if operation == 'move-posts':
+            group = (
+                self.get_group('to_group') if options['to_group'] else None
+            )
+            done = moderation.move_posts(
+                queryset, group, options['batch_size'], self.progress
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'Перенесено постов: {done}'
+            ))
+        elif operation == 'delete-posts':
+            done = moderation.delete_posts(
+                queryset, options['batch_size'], self.progress
+            )
+            self.stdout.write(self.style.SUCCESS(f'Удалено постов: {done}'))
+        else:
+            done = moderation.delete_comments(
+                queryset, options['batch_size'], self.progress
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'Удалено комментариев: {done}'
+            ))
+
+    def filter(self, queryset, date_field, post_prefix=''):
+        """Условия отбора; применённые запоминаются в self.applied.
+
+        Для комментариев группа берётся у поста (post_prefix='post__').
+        """
+        options = self.options
+        if options['author']:
+            try:
+                author = User.objects.get(username=options['author'])
+            except User.DoesNotExist:
+                raise CommandError(f'Нет пользователя {options["author"]}')
+            queryset = queryset.filter(author=author)
+            self.applied.append('author')
+        if options['group']:
+            queryset = queryset.filter(**{
+                f'{post_prefix}group': self.get_group('group')
+            })
+            self.applied.append('group')
+        if options['since']:
+            queryset = queryset.filter(**{
+                f'{date_field}__gte': self.parse('since')
+            })
+            self.applied.append('since')
+        if options['until']:
+            queryset = queryset.filter(**{
+                f'{date_field}__lt': self.parse('until')
+            })
+            self.applied.append('until')
+        return queryset
+
+    def get_group(self, option):
+        try:
+            return Group.objects.get(slug=self.options[option])
+        except Group.DoesNotExist:
+            raise CommandError(f'Нет группы {self.options[option]}')
+
+    def parse(self, option):
+        value = self.options[option]
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                raise CommandError(f'Некорректная дата --{option}: {value}')
+            moment = datetime.combine(day, time.min)
+        if settings.USE_TZ and timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+
+    def progress(self, done, total):
+        self.stdout.write(f'Обработано {done} из {total}')
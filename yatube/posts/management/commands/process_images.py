@@ -0,0 +1,68 @@
+import os
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+
+from core.storage import BLOB_NAME
+from posts import fragments, images
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Обрабатывает картинки постов, загруженные до появления обработки '
+        'при загрузке: уменьшает, убирает EXIF, перекодирует и записывает '
+        'размеры в пост'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-originals', action='store_true',
+            help='Не удалять исходные файлы',
+        )
+
+    def handle(self, *args, **options):
+        # Один файл может быть у нескольких постов
+        names = Post.objects.exclude(image='').filter(
+            image_width=None
+        ).order_by().values_list('image', flat=True).distinct()
+        storage = Post.image.field.storage
+        processed = failed = 0
+        for name in list(names.iterator()):
+            try:
+                with storage.open(name) as original:
+                    result = images.process(original)
+                    if result.file is original:
+                        # GIF остаётся прежним файлом
+                        new_name = name
+                    else:
+                        with result.file:
+                            new_name = storage.save(
+                                f'posts/{result.file.name}', result.file
+                            )
+            except (OSError, ValidationError) as error:
+                failed += 1
+                self.stderr.write(f'{name}: {error}')
+                continue
+            Post.objects.filter(image=name).update(
+                image=new_name,
+                image_width=result.width,
+                image_height=result.height,
+            )
+            # Файл из хранилища по содержимому может понадобиться другим
+            # строкам; его удалит manage.py gc_media
+            if (
+                new_name != name and not options['keep_originals']
+                and not BLOB_NAME.fullmatch(os.path.basename(name))
+            ):
+                storage.delete(name)
+            processed += 1
+        if processed:
+            fragments.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {processed}, с ошибками: {failed}'
+        ))
+        if processed:
+            self.stdout.write(
+                'Превью новых файлов создаст manage.py generate_thumbnails'
+            )
@@ -0,0 +1,206 @@
+import io
+import random
+import time
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image
+
+from core.storage import media_storage
+from posts import thumbnails
+from posts.bulk import keep_field_value, rebuild_derived
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Все созданные объекты помечены префиксом, чтобы их можно было удалить
+PREFIX = 'seed-'
+
+IMAGE_SIZE = (1200, 800)
+
+WORDS = (
+    'лента пост автор группа комментарий подписка картинка текст новость '
+    'город погода музыка кино книга путешествие код django python sqlite '
+    'кэш индекс запрос страница утро вечер друг работа отдых'
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт воспроизводимый синтетический набор данных для '
+        'нагрузочного тестирования (manage.py loadtest)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=50000)
+        parser.add_argument('--comments', type=int, default=100000)
+        parser.add_argument(
+            '--images', type=int, default=10,
+            help='Сколько разных картинок создать для постов',
+        )
+        parser.add_argument(
+            '--image-ratio', type=float, default=0.1,
+            help='Доля постов с картинкой',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=42,
+            help='Начальное значение генератора случайных чисел',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить ранее созданные данные перед загрузкой',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.random = random.Random(options['seed'])
+        started = time.monotonic()
+        if options['clear']:
+            self.clear()
+        with keep_field_value(Post, 'pub_date'), \
+                keep_field_value(Comment, 'created'):
+            users = self.create_users()
+            groups = self.create_groups()
+            images = self.create_images()
+            posts = self.create_posts(users, groups, images)
+            self.create_comments(users, posts)
+            self.create_follows(users)
+        rebuild_derived()
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные созданы за {time.monotonic() - started:.1f} с'
+        ))
+
+    def clear(self):
+        with transaction.atomic():
+            users = User.objects.filter(username__startswith=PREFIX)
+            Comment.objects.filter(author__in=users).delete()
+            Post.objects.filter(author__in=users).delete()
+            Follow.objects.filter(
+                Q(user__in=users) | Q(author__in=users)
+            ).delete()
+            Group.objects.filter(slug__startswith=PREFIX).delete()
+            users.delete()
+
+    def insert(self, model, objects):
+        """Вставляет объекты из генератора пачками по --batch-size."""
+        objects = iter(objects)
+        total = 0
+        while True:
+            batch = list(islice(objects, self.options['batch_size']))
+            if not batch:
+                break
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+            total += len(batch)
+        self.stdout.write(f'{model.__name__}: {total}')
+
+    def text(self, words):
+        return ' '.join(self.random.choices(WORDS, k=words)).capitalize()
+
+    def create_users(self):
+        def users():
+            for number in range(self.options['users']):
+                user = User(
+                    username=f'{PREFIX}user-{number}',
+                    first_name=f'Имя{number}',
+                    last_name=f'Фамилия{number}',
+                )
+                user.set_unusable_password()
+                yield user
+
+        self.insert(User, users())
+        return list(User.objects.filter(
+            username__startswith=PREFIX
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def create_groups(self):
+        self.insert(Group, (
+            Group(
+                title=f'Группа {number}',
+                slug=f'{PREFIX}group-{number}',
+                description=self.text(20),
+            )
+            for number in range(self.options['groups'])
+        ))
+        return list(Group.objects.filter(
+            slug__startswith=PREFIX
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def create_images(self):
+        names = []
+        for number in range(self.options['images']):
+            buffer = io.BytesIO()
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            Image.new('RGB', IMAGE_SIZE, color).save(buffer, 'JPEG')
+            # Хранилище по содержимому: повторный запуск с тем же --seed
+            # не создаёт новых файлов
+            names.append(media_storage.save(
+                f'posts/{PREFIX}{number}.jpg', ContentFile(buffer.getvalue())
+            ))
+            thumbnails.generate(names[-1])
+        return names
+
+    def create_posts(self, users, groups, images):
+        now = timezone.now()
+
+        def posts():
+            for number in range(self.options['posts']):
+                post = Post(
+                    text=self.text(self.random.randint(5, 60)),
+                    author_id=self.random.choice(users),
+                    group_id=(
+                        self.random.choice(groups)
+                        if groups and self.random.random() < 0.5 else None
+                    ),
+                    pub_date=now - timedelta(minutes=number),
+                )
+                ratio = self.options['image_ratio']
+                if images and self.random.random() < ratio:
+                    post.image = self.random.choice(images)
+                    post.image_width, post.image_height = IMAGE_SIZE
+                yield post
+
+        self.insert(Post, posts())
+        return list(Post.objects.filter(
+            author__username__startswith=PREFIX
+        ).order_by('pk').values_list('pk', 'pub_date'))
+
+    def create_comments(self, users, posts):
+        if not posts:
+            return
+        # Комментарии распределены неравномерно: у немногих постов
+        # их очень много, как у популярных записей
+        weights = [1 / (rank + 1) for rank in range(len(posts))]
+        chosen = self.random.choices(
+            posts, weights=weights, k=self.options['comments']
+        )
+        self.insert(Comment, (
+            Comment(
+                post_id=post_id,
+                author_id=self.random.choice(users),
+                text=self.text(self.random.randint(3, 20)),
+                created=pub_date + timedelta(
+                    seconds=self.random.randint(1, 3600)
+                ),
+            )
+            for post_id, pub_date in chosen
+        ))
+
+    def create_follows(self, users):
+        # Follow.author уникален, поэтому у каждого автора не больше
+        # одного подписчика: подписки раздаются по кругу
+        authors = users[:]
+        self.random.shuffle(authors)
+        self.insert(Follow, (
+            Follow(user_id=user, author_id=author)
+            for user, author in zip(users, authors) if user != author
+        ))
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_auto_20211221_2349'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=64, unique=True, verbose_name='Область подсчёта')),
+                ('value', models.IntegerField(default=0, verbose_name='Значение')),
+            ],
+        ),
+    ]
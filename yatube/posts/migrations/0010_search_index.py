@@ -0,0 +1,117 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:13
+
+import re
+from collections import Counter
+from itertools import chain
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.utils import OperationalError
+import django.db.models.deletion
+
+# Веса posts.search на момент миграции
+POST_WEIGHT = 2
+COMMENT_WEIGHT = 1
+
+FTS_TABLES = (
+    'CREATE VIRTUAL TABLE posts_search_post USING fts5(text)',
+    'CREATE VIRTUAL TABLE posts_search_comment '
+    'USING fts5(post_id UNINDEXED, text)',
+)
+
+FTS_BACKFILL = (
+    'INSERT INTO posts_search_post (rowid, text) '
+    'SELECT id, text FROM posts_post',
+    'INSERT INTO posts_search_comment (rowid, post_id, text) '
+    'SELECT id, post_id, text FROM posts_comment',
+)
+
+
+def create_fts_tables(apps, schema_editor):
+    """Таблицы SQLite FTS5; на других базах работает запасной индекс.
+
+    Индекс сразу наполняется уже написанными постами и комментариями.
+    """
+    if schema_editor.connection.vendor == 'sqlite':
+        try:
+            for sql in FTS_TABLES:
+                schema_editor.execute(sql)
+        except OperationalError:
+            # SQLite собран без FTS5
+            pass
+        else:
+            for sql in FTS_BACKFILL:
+                schema_editor.execute(sql)
+            return
+    backfill_search_terms(apps, schema_editor)
+
+
+def tokenize(text):
+    # Копия posts.search.tokenize на момент миграции
+    return [word[:64] for word in re.findall(r'\w+', text.lower())]
+
+
+def backfill_search_terms(apps, schema_editor, batch_size=1000):
+    """Наполняет запасной индекс, как manage.py rebuild_search_index."""
+    Comment = apps.get_model('posts', 'Comment')
+    Post = apps.get_model('posts', 'Post')
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    database = schema_editor.connection.alias
+    posts = Post.objects.using(database).values_list('pk', 'text')
+    comments = Comment.objects.using(database).values_list(
+        'pk', 'post_id', 'text'
+    )
+    rows = chain(
+        (
+            (text, POST_WEIGHT, {'post_id': post_id})
+            for post_id, text in posts.iterator(chunk_size=batch_size)
+        ),
+        (
+            (text, COMMENT_WEIGHT,
+             {'post_id': post_id, 'comment_id': comment_id})
+            for comment_id, post_id, text
+            in comments.iterator(chunk_size=batch_size)
+        ),
+    )
+    batch = []
+    for text, weight, fields in rows:
+        batch.extend(
+            SearchTerm(term=term, weight=weight * frequency, **fields)
+            for term, frequency in Counter(tokenize(text)).items()
+        )
+        if len(batch) >= batch_size:
+            SearchTerm.objects.using(database).bulk_create(batch)
+            batch = []
+    SearchTerm.objects.using(database).bulk_create(batch)
+
+
+def drop_fts_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS posts_search_post')
+    schema_editor.execute('DROP TABLE IF EXISTS posts_search_comment')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Слово')),
+                ('weight', models.PositiveIntegerField(default=1, verbose_name='Вес')),
+                ('comment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Comment', verbose_name='Комментарий')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post', verbose_name='Пост')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(fields=['term', 'post'], name='posts_search_term_post'),
+        ),
+        migrations.RunPython(create_fts_tables, drop_fts_tables),
+    ]
@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.storage import media_storage
+
 User = get_user_model()
 
 
@@ -13,6 +15,30 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для карточек ленты одним запросом.
+
+        Автор и группа подтягиваются JOIN-ом, из таблиц читаются только
+        поля, которые выводят шаблоны.
+        """
+        return self.select_related('author', 'group').only(
+            'text',
+            'pub_date',
+            'image',
+            'image_width',
+            'image_height',
+            'author',
+            'author__username',
+            'author__first_name',
+            'author__last_name',
+            'group',
+            'group__slug',
+            'group__title',
+            'comments_count',
+        ).order_by('-pub_date', '-pk')
+
+
 class Post(models.Model):
     text = models.TextField('Текст', help_text='Введите текст поста')
     pub_date = models.DateTimeField(
@@ -38,11 +64,41 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=media_storage,
         blank=True
     )
+    # Размеры записывает posts.images.process при загрузке, чтобы
+    # шаблонам и API не приходилось открывать файл
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        null=True,
+        editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='posts_post_author_date',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='posts_post_group_date',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -67,6 +123,14 @@ class Comment(models.Model):
     )
     created = models.DateTimeField('Дата комментария', auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='posts_comment_post_created',
+            ),
+        ]
+
     def __str__(self):
         return self.text[:15]
 
@@ -86,5 +150,100 @@ class Follow(models.Model):
         verbose_name='Автор, на которого подписались'
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'author'],
+                name='posts_follow_user_author',
+            ),
+        ]
+
     def __str__(self):
         return str(self.user)
+
+
+class Counter(models.Model):
+    """Хранимое число постов в области (все посты, группа, автор).
+
+    Поддерживается сигналами из posts.signals, читается через
+    posts.counters, чтобы паджинатор не делал COUNT(*) по постам.
+    """
+    scope = models.CharField('Область подсчёта', max_length=64, unique=True)
+    value = models.IntegerField('Значение', default=0)
+
+    def __str__(self):
+        return f'{self.scope}: {self.value}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя.
+
+    Записи создаёт posts.timeline при публикации поста, подписке
+    и отписке, если включён settings.FOLLOW_TIMELINE.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Владелец ленты'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор поста'
+    )
+    pub_date = models.DateTimeField('Дата публикации поста')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='posts_timeline_user_date_post',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.post}'
+
+
+class SearchTerm(models.Model):
+    """Слово поста или комментария в запасном поисковом индексе.
+
+    Используется posts.search, когда база не поддерживает SQLite FTS5.
+    """
+    term = models.CharField('Слово', max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Пост'
+    )
+    comment = models.ForeignKey(
+        Comment,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Комментарий'
+    )
+    weight = models.PositiveIntegerField('Вес', default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['term', 'post'],
+                name='posts_search_term_post',
+            ),
+        ]
+
+    def __str__(self):
+        return self.term
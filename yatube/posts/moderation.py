@@ -0,0 +1,120 @@
+"""Массовая модерация: перенос постов между группами и удаление пачками.
+
+Обычное удаление QuerySet загружает все объекты и для каждого поста
+и комментария отправляет сигналы, которые по одному обновляют счётчики,
+поисковый индекс и версию кэша лент. Здесь строки обрабатываются
+пачками по id, каждая пачка — в своей транзакции и без сигналов:
+зависимые строки удаляются запросами на всю пачку, а счётчики, индекс
+и кэш лент обновляются один раз на пачку. В памяти держатся только id
+одной пачки.
+
+progress(done, total) вызывается после каждой пачки.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from . import counters, fragments, search
+from .models import Comment, Post, SearchTerm, TimelineEntry
+
+BATCH_SIZE = 1000
+
+
+def _batches(queryset, batch_size):
+    """id строк queryset пачками по возрастанию, без загрузки объектов."""
+    ids = queryset.order_by('pk').values_list('pk', flat=True)
+    last = 0
+    while True:
+        batch = list(ids.filter(pk__gt=last)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1]
+
+
+def _run(queryset, handle, batch_size, progress):
+    total = queryset.count() if progress else None
+    done = 0
+    for ids in _batches(queryset, batch_size):
+        with transaction.atomic():
+            handle(ids)
+        fragments.invalidate()
+        done += len(ids)
+        if progress:
+            progress(done, total)
+    return done
+
+
+def _delete(queryset):
+    # Одним запросом DELETE, без сигналов и каскада: зависимые строки
+    # к этому моменту уже удалены
+    return queryset._raw_delete(queryset.db)
+
+
+def _change_post_counters(ids, sign):
+    deltas = defaultdict(int)
+    rows = Post.objects.filter(pk__in=ids).order_by().values(
+        'group_id', 'author_id'
+    ).annotate(total=Count('pk'))
+    for row in rows:
+        for scope in counters.post_scopes(row['group_id'], row['author_id']):
+            deltas[scope] += sign * row['total']
+    for scope, delta in deltas.items():
+        counters.change(scope, delta)
+
+
+def move_posts(queryset, group, batch_size=BATCH_SIZE, progress=None):
+    """Переносит посты в группу group (None — убирает из групп).
+
+    Возвращает число перенесённых постов.
+    """
+    if group is None:
+        queryset = queryset.exclude(group=None)
+    else:
+        queryset = queryset.exclude(group=group)
+
+    def handle(ids):
+        _change_post_counters(ids, -1)
+        Post.objects.filter(pk__in=ids).update(group=group)
+        _change_post_counters(ids, 1)
+
+    return _run(queryset, handle, batch_size, progress)
+
+
+def delete_posts(queryset, batch_size=BATCH_SIZE, progress=None):
+    """Удаляет посты вместе с комментариями; возвращает число постов."""
+    def handle(ids):
+        _change_post_counters(ids, -1)
+        comment_ids = list(Comment.objects.filter(
+            post_id__in=ids
+        ).values_list('pk', flat=True))
+        search.get_backend().remove_many(ids, comment_ids)
+        # На строки запасного индекса ссылается внешний ключ, поэтому
+        # они удаляются при любом бэкенде
+        SearchTerm.objects.filter(post_id__in=ids).delete()
+        TimelineEntry.objects.filter(post_id__in=ids).delete()
+        _delete(Comment.objects.filter(post_id__in=ids))
+        _delete(Post.objects.filter(pk__in=ids))
+
+    return _run(queryset, handle, batch_size, progress)
+
+
+def delete_comments(queryset, batch_size=BATCH_SIZE, progress=None):
+    """Удаляет комментарии; возвращает их число."""
+    def handle(ids):
+        by_count = defaultdict(list)
+        rows = Comment.objects.filter(pk__in=ids).order_by().values(
+            'post_id'
+        ).annotate(total=Count('pk')).values_list('post_id', 'total')
+        for post_id, total in rows:
+            by_count[total].append(post_id)
+        for total, post_ids in by_count.items():
+            Post.objects.filter(pk__in=post_ids).update(
+                comments_count=F('comments_count') - total
+            )
+        search.get_backend().remove_many([], ids)
+        SearchTerm.objects.filter(comment_id__in=ids).delete()
+        _delete(Comment.objects.filter(pk__in=ids))
+
+    return _run(queryset, handle, batch_size, progress)
@@ -0,0 +1,241 @@
+import base64
+import json
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from core.db import estimated_count
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+class CountedPaginator(Paginator):
+    """Paginator, которому число объектов передаётся извне.
+
+    count — число или функция без аргументов, обычно чтение хранимого
+    счётчика из posts.counters. Счётчик может ненадолго расходиться
+    с таблицей, поэтому страница не обрезается по count: на ней всегда
+    до per_page объектов из самого запроса.
+    """
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._count = count
+
+    @cached_property
+    def count(self):
+        if callable(self._count):
+            return self._count()
+        return self._count
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(
+            self.object_list[bottom:bottom + self.per_page], number, self
+        )
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator админки без COUNT(*) по всей большой таблице.
+
+    Для списка без фильтров и поиска число строк берётся из статистики
+    базы (core.db.estimated_count) и точного счёта, который кэшируется
+    на ADMIN_COUNT_CACHE_TIMEOUT секунд. Отфильтрованные списки
+    и таблицы меньше ADMIN_EXACT_COUNT_LIMIT строк считаются точно.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if queryset.query.where:
+            return queryset.count()
+        estimate = estimated_count(queryset.model, queryset.db)
+        if estimate is not None and (
+            estimate < settings.ADMIN_EXACT_COUNT_LIMIT
+        ):
+            return queryset.count()
+        # Статистика отстаёт от таблицы: SQLite обновляет sqlite_stat1
+        # только по ANALYZE. Оценка не опускается ниже точного счёта не
+        # старше ADMIN_COUNT_CACHE_TIMEOUT, иначе новые строки не
+        # попадут на последние страницы
+        exact = cache.get_or_set(
+            f'admin:count:{queryset.db}:{queryset.model._meta.db_table}',
+            queryset.count,
+            settings.ADMIN_COUNT_CACHE_TIMEOUT,
+        )
+        return max(exact, estimate or 0)
+
+
+class CursorPaginator:
+    """Постраничный вывод по ключу сортировки (keyset pagination).
+
+    Вместо OFFSET страница задаётся курсором — значениями полей
+    сортировки крайнего поста соседней страницы. Запрос всегда читает
+    per_page + 1 строк по индексу, поэтому время ответа не зависит
+    от глубины листания, а общий COUNT(*) не нужен вовсе.
+
+    Без ordering берётся порядок самого QuerySet; ключом могут быть и
+    аннотации, например поля записи ленты в posts.timeline.feed.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, ordering=None):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(
+            ordering or object_list.query.order_by or ('-pub_date', '-pk')
+        )
+        self.model = object_list.model
+
+    def get_page(self, cursor):
+        """Как Paginator.get_page: битый курсор ведёт на первую страницу."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page(None)
+
+    def page(self, cursor):
+        """Страница по курсору; запрос выполняется при первом обращении."""
+        if not cursor:
+            return CursorPage(self, None, None)
+        direction, values = self.decode(cursor)
+        return CursorPage(self, direction, values)
+
+    def fetch(self, direction, values):
+        """Объекты страницы и признаки соседних страниц."""
+        if direction is None:
+            rows = list(self.object_list.order_by(*self.ordering)[
+                :self.per_page + 1
+            ])
+            return rows[:self.per_page], len(rows) > self.per_page, False
+        if direction == NEXT:
+            rows = list(
+                self.object_list.order_by(*self.ordering).filter(
+                    self._seek(values, forward=True)
+                )[:self.per_page + 1]
+            )
+            return rows[:self.per_page], len(rows) > self.per_page, True
+        rows = list(
+            self.object_list.order_by(*self._reversed_ordering()).filter(
+                self._seek(values, forward=False)
+            )[:self.per_page + 1]
+        )
+        return rows[:self.per_page][::-1], True, len(rows) > self.per_page
+
+    def encode(self, direction, obj):
+        values = [
+            self._get_field(name).value_to_string(
+                # value_to_string читает значение по attname поля
+                SimpleNamespace(**{
+                    self._get_field(name).attname: getattr(obj, name)
+                })
+            )
+            for name in self._field_names()
+        ]
+        raw = json.dumps([direction] + values).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, *values = json.loads(raw.decode())
+            if direction not in (NEXT, PREVIOUS):
+                raise ValueError(direction)
+            if len(values) != len(self.ordering):
+                raise ValueError(values)
+            return direction, [
+                self._get_field(name).to_python(value)
+                for name, value in zip(self._field_names(), values)
+            ]
+        except Exception as error:
+            raise InvalidCursor(f'Некорректный курсор: {cursor}') from error
+
+    def _field_names(self):
+        return [name.lstrip('-') for name in self.ordering]
+
+    def _get_field(self, name):
+        if name == 'pk':
+            return self.model._meta.pk
+        annotation = self.object_list.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return self.model._meta.get_field(name)
+
+    def _reversed_ordering(self):
+        return [
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        ]
+
+    def _seek(self, values, forward):
+        """Условие «строго после курсора» для составного ключа.
+
+        Для ключа (a, b) по убыванию это a < x OR (a = x AND b < y).
+        """
+        condition = Q()
+        equal = {}
+        for name, value in zip(self.ordering, values):
+            field = name.lstrip('-')
+            descending = name.startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return condition
+
+
+class CursorPage:
+    def __init__(self, paginator, direction, values):
+        self.paginator = paginator
+        self.direction = direction
+        self.values = values
+
+    @cached_property
+    def _fetched(self):
+        return self.paginator.fetch(self.direction, self.values)
+
+    @property
+    def object_list(self):
+        return self._fetched[0]
+
+    def __repr__(self):
+        return f'<Cursor page of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._fetched[1]
+
+    def has_previous(self):
+        return self._fetched[2]
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if not self.has_next() or not self.object_list:
+            return None
+        return self.paginator.encode(NEXT, self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous() or not self.object_list:
+            return None
+        return self.paginator.encode(PREVIOUS, self.object_list[0])
@@ -0,0 +1,336 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+На SQLite с FTS5 индекс хранится в виртуальных таблицах
+posts_search_post и posts_search_comment и ранжируется по bm25.
+На остальных базах работает запасной индекс: слова, выделенные
+в Python, лежат в таблице SearchTerm с индексом (term, post).
+Оба индекса обновляются сигналами при записи постов и комментариев
+и пересобираются командой manage.py rebuild_search_index.
+"""
+import re
+from collections import Counter as TermCounter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+
+from .models import Comment, Post, SearchTerm
+
+WORD_RE = re.compile(r'\w+')
+
+# Совпадение в тексте поста важнее совпадения в комментарии
+POST_WEIGHT = 2
+COMMENT_WEIGHT = 1
+
+
+def tokenize(text):
+    words = WORD_RE.findall(text.lower())
+    return [word[:64] for word in words]
+
+
+class FTS5Backend:
+    name = 'fts5'
+
+    def index_post(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM posts_search_post WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                'INSERT INTO posts_search_post (rowid, text) '
+                'VALUES (%s, %s)',
+                [post.pk, post.text],
+            )
+
+    def remove_post(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM posts_search_post WHERE rowid = %s', [post_id]
+            )
+
+    def index_comment(self, comment):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM posts_search_comment WHERE rowid = %s',
+                [comment.pk],
+            )
+            cursor.execute(
+                'INSERT INTO posts_search_comment (rowid, post_id, text) '
+                'VALUES (%s, %s, %s)',
+                [comment.pk, comment.post_id, comment.text],
+            )
+
+    def remove_comment(self, comment_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM posts_search_comment WHERE rowid = %s',
+                [comment_id],
+            )
+
+    def remove_many(self, post_ids, comment_ids):
+        with connection.cursor() as cursor:
+            for table, ids in (
+                ('posts_search_post', post_ids),
+                ('posts_search_comment', comment_ids),
+            ):
+                # Пачками, чтобы не упереться в предел числа параметров
+                for batch in _batches(ids, 500):
+                    placeholders = ', '.join(['%s'] * len(batch))
+                    cursor.execute(
+                        f'DELETE FROM {table} WHERE rowid IN ({placeholders})',
+                        batch,
+                    )
+
+    def _match(self, words):
+        # Каждое слово в кавычках: ввод пользователя не станет
+        # синтаксисом запроса FTS5
+        return ' '.join('"{}"'.format(word.replace('"', '""'))
+                        for word in words)
+
+    def _ranked_sql(self):
+        return (
+            'SELECT post_id, MIN(rank) AS rank FROM ('
+            ' SELECT rowid AS post_id, bm25(posts_search_post) * {post}'
+            ' AS rank FROM posts_search_post'
+            ' WHERE posts_search_post MATCH %s'
+            ' UNION ALL'
+            ' SELECT post_id, bm25(posts_search_comment) * {comment}'
+            ' AS rank FROM posts_search_comment'
+            ' WHERE posts_search_comment MATCH %s'
+            ') GROUP BY post_id'
+        ).format(post=POST_WEIGHT, comment=COMMENT_WEIGHT)
+
+    def search(self, words, offset, limit):
+        match = self._match(words)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                self._ranked_sql() + ' ORDER BY rank, post_id DESC'
+                ' LIMIT %s OFFSET %s',
+                [match, match, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def search_comments(self, words, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT rowid FROM posts_search_comment '
+                'WHERE posts_search_comment MATCH %s ORDER BY rank LIMIT %s',
+                [self._match(words), limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def count(self, words):
+        match = self._match(words)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM ({self._ranked_sql()})', [match, match]
+            )
+            return cursor.fetchone()[0]
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM posts_search_post')
+            cursor.execute('DELETE FROM posts_search_comment')
+
+    def bulk_index(self, posts, comments):
+        with connection.cursor() as cursor:
+            if posts:
+                cursor.executemany(
+                    'INSERT INTO posts_search_post (rowid, text) '
+                    'VALUES (%s, %s)',
+                    posts,
+                )
+            if comments:
+                cursor.executemany(
+                    'INSERT INTO posts_search_comment (rowid, post_id, text) '
+                    'VALUES (%s, %s, %s)',
+                    comments,
+                )
+
+
+class PythonBackend:
+    name = 'python'
+
+    def _terms(self, text, weight, **fields):
+        return [
+            SearchTerm(term=term, weight=weight * frequency, **fields)
+            for term, frequency in TermCounter(tokenize(text)).items()
+        ]
+
+    def index_post(self, post):
+        SearchTerm.objects.filter(post_id=post.pk, comment=None).delete()
+        SearchTerm.objects.bulk_create(
+            self._terms(post.text, POST_WEIGHT, post_id=post.pk)
+        )
+
+    def remove_post(self, post_id):
+        SearchTerm.objects.filter(post_id=post_id).delete()
+
+    def index_comment(self, comment):
+        SearchTerm.objects.filter(comment_id=comment.pk).delete()
+        SearchTerm.objects.bulk_create(self._terms(
+            comment.text, COMMENT_WEIGHT,
+            post_id=comment.post_id, comment_id=comment.pk
+        ))
+
+    def remove_comment(self, comment_id):
+        SearchTerm.objects.filter(comment_id=comment_id).delete()
+
+    def remove_many(self, post_ids, comment_ids):
+        SearchTerm.objects.filter(
+            Q(post_id__in=post_ids) | Q(comment_id__in=comment_ids)
+        ).delete()
+
+    def _ranked(self, words):
+        words = set(words)
+        return SearchTerm.objects.filter(term__in=words).values(
+            'post_id'
+        ).annotate(
+            matched=Count('term', distinct=True),
+            score=Sum('weight'),
+        ).filter(matched=len(words))
+
+    def search(self, words, offset, limit):
+        rows = self._ranked(words).order_by('-score', '-post_id')
+        return [
+            row['post_id'] for row in rows[offset:offset + limit]
+        ]
+
+    def search_comments(self, words, limit):
+        words = set(words)
+        rows = SearchTerm.objects.filter(
+            term__in=words, comment__isnull=False
+        ).values('comment_id').annotate(
+            matched=Count('term', distinct=True),
+            score=Sum('weight'),
+        ).filter(matched=len(words)).order_by('-score', '-comment_id')
+        return [row['comment_id'] for row in rows[:limit]]
+
+    def count(self, words):
+        return self._ranked(words).count()
+
+    def clear(self):
+        SearchTerm.objects.all().delete()
+
+    def bulk_index(self, posts, comments):
+        terms = []
+        for post_id, text in posts:
+            terms.extend(self._terms(text, POST_WEIGHT, post_id=post_id))
+        for comment_id, post_id, text in comments:
+            terms.extend(self._terms(
+                text, COMMENT_WEIGHT, post_id=post_id, comment_id=comment_id
+            ))
+        SearchTerm.objects.bulk_create(terms)
+
+
+_fts5_tables = {}
+
+
+def fts5_available():
+    """Есть ли в базе таблицы FTS5; проверяется один раз на базу."""
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts5_tables:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'posts_search_post'"
+            )
+            _fts5_tables[name] = cursor.fetchone() is not None
+    return _fts5_tables[name]
+
+
+def get_backend():
+    if settings.SEARCH_BACKEND == 'python':
+        return PythonBackend()
+    if settings.SEARCH_BACKEND == 'fts5' or fts5_available():
+        return FTS5Backend()
+    return PythonBackend()
+
+
+def rebuild(batch_size=1000):
+    """Пересобирает индекс активного бэкенда, читая таблицы частями.
+
+    Всё выполняется в одной транзакции: поиск не видит индекс
+    наполовину пустым, а вставки не фиксируются на диск по одной.
+    """
+    backend = get_backend()
+    with transaction.atomic():
+        backend.clear()
+        posts = Post.objects.order_by().values_list(
+            'pk', 'text'
+        ).iterator(chunk_size=batch_size)
+        for batch in _batches(posts, batch_size):
+            backend.bulk_index(batch, [])
+        comments = Comment.objects.order_by().values_list(
+            'pk', 'post_id', 'text'
+        ).iterator(chunk_size=batch_size)
+        for batch in _batches(comments, batch_size):
+            backend.bulk_index([], batch)
+    return backend
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def comment_ids(query, limit):
+    """id комментариев, в тексте которых есть все слова запроса."""
+    words = tokenize(query)
+    if not words:
+        return []
+    return get_backend().search_comments(words, limit)
+
+
+def prefix_q(field, prefix):
+    """Условие «field начинается с prefix» в виде диапазона значений.
+
+    В отличие от LIKE, который SQLite выполняет перебором строк,
+    диапазон field >= prefix AND field < следующая строка читается
+    по обычному индексу поля. Сравнение учитывает регистр.
+    """
+    last = ord(prefix[-1])
+    if last == 0x10FFFF:
+        return Q(**{f'{field}__gte': prefix})
+    following = last + 1
+    if 0xD800 <= following <= 0xDFFF:
+        # Суррогаты не кодируются в UTF-8, следующий символ — U+E000
+        following = 0xE000
+    return Q(**{
+        f'{field}__gte': prefix,
+        f'{field}__lt': prefix[:-1] + chr(following),
+    })
+
+
+class SearchResults:
+    """Результаты поиска для Paginator: счёт и срезы по рангу."""
+
+    def __init__(self, query, queryset=None):
+        self.words = tokenize(query)
+        self.queryset = queryset if queryset is not None else Post.objects
+        self.backend = get_backend()
+
+    def count(self):
+        if not self.words:
+            return 0
+        return self.backend.count(self.words)
+
+    def ids(self, offset, limit):
+        if not self.words:
+            return []
+        return self.backend.search(self.words, offset, limit)
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            raise TypeError('SearchResults поддерживает только срезы')
+        start = item.start or 0
+        ids = self.ids(start, item.stop - start)
+        posts = self.queryset.in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
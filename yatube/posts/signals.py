@@ -0,0 +1,154 @@
+from django.conf import settings
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import metrics
+from . import counters, fragments, search, tasks, timeline
+from .models import Comment, Follow, Group, Post
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_post(sender, instance, **kwargs):
+    """Запоминает группу, автора и картинку поста до редактирования."""
+    instance._old_scopes = []
+    instance._old_image = None
+    if instance.pk is None:
+        return
+    old = Post.objects.filter(pk=instance.pk).values(
+        'group_id', 'author_id', 'image'
+    ).first()
+    if old is not None:
+        instance._old_image = old.pop('image')
+        instance._old_scopes = counters.post_scopes(**old)
+
+
+@receiver(post_save, sender=Post)
+def update_post_counters(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    new_scopes = counters.post_scopes(instance.group_id, instance.author_id)
+    old_scopes = [] if created else getattr(instance, '_old_scopes', [])
+    for scope in set(new_scopes) - set(old_scopes):
+        counters.change(scope, 1)
+    for scope in set(old_scopes) - set(new_scopes):
+        counters.change(scope, -1)
+
+
+@receiver(post_delete, sender=Post)
+def decrease_post_counters(sender, instance, **kwargs):
+    for scope in counters.post_scopes(instance.group_id, instance.author_id):
+        counters.change(scope, -1)
+
+
+@receiver(post_save, sender=Comment)
+def increase_comments_count(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Post.objects.filter(pk=instance.post_id).update(
+            comments_count=F('comments_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def decrease_comments_count(sender, instance, **kwargs):
+    Post.objects.filter(pk=instance.post_id).update(
+        comments_count=F('comments_count') - 1
+    )
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and settings.FOLLOW_TIMELINE:
+        tasks.fan_out_post.delay(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and settings.FOLLOW_TIMELINE:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    if settings.FOLLOW_TIMELINE:
+        timeline.prune(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def schedule_thumbnails(sender, instance, created, raw=False, **kwargs):
+    if raw or not instance.image:
+        return
+    if created or instance.image.name != getattr(instance, '_old_image', None):
+        tasks.generate_thumbnails.delay(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_fragments(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Пост, перенесённый в другую группу, пропадает из старой ленты
+    fragments.invalidate(
+        *counters.post_scopes(instance.group_id, instance.author_id),
+        *getattr(instance, '_old_scopes', []),
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_fragments(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    post = Post.objects.filter(pk=instance.post_id).values(
+        'group_id', 'author_id'
+    ).first()
+    # Пост удаляется вместе с комментариями и сбросит ленты сам
+    if post is not None:
+        fragments.invalidate(*counters.post_scopes(**post))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_fragments(sender, instance, raw=False, **kwargs):
+    if not raw:
+        fragments.invalidate(fragments.follow_scope(instance.user_id))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_fragments(sender, raw=False, **kwargs):
+    # Название группы выводится в карточках всех лент
+    if not raw:
+        fragments.invalidate()
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.get_backend().index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.get_backend().remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.get_backend().index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    search.get_backend().remove_comment(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Follow)
+def count_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        metrics.inc(
+            'yatube_objects_created_total', model=sender._meta.model_name
+        )
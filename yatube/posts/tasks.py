@@ -0,0 +1,18 @@
+from core.jobs import task
+
+from . import thumbnails, timeline
+from .models import Post
+
+
+@task()
+def fan_out_post(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        timeline.fan_out(post)
+
+
+@task()
+def generate_thumbnails(post_id):
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is not None and post.image:
+        thumbnails.generate(post.image)
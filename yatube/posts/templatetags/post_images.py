@@ -0,0 +1,55 @@
+import logging
+
+from django import template
+from django.conf import settings
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.parsers import parse_geometry
+
+register = template.Library()
+
+logger = logging.getLogger(__name__)
+
+
+def _fits(post, geometry):
+    """Помещается ли картинка в geometry по размерам из строки поста."""
+    if not post.image_width or not post.image_height:
+        return False
+    width, height = parse_geometry(geometry)
+    return (
+        (width is None or post.image_width <= width)
+        and (height is None or post.image_height <= height)
+    )
+
+
+@register.inclusion_tag('posts/includes/post_image.html')
+def post_image(post):
+    """Превью картинки поста со ссылкой на крупную версию.
+
+    Картинки, обработанные при загрузке, не больше крупного размера из
+    THUMBNAIL_GEOMETRIES: по их размерам в строке поста ссылка ведёт на
+    сам файл без лишней копии. Размеры превью sorl берёт из своего
+    хранилища ключ-значение, файл картинки при этом не открывается.
+    """
+    if not post.image:
+        return {}
+    (big, big_options), (small, small_options) = (
+        settings.THUMBNAIL_GEOMETRIES
+    )
+    try:
+        if _fits(post, big):
+            big_url = post.image.url
+        else:
+            big_url = get_thumbnail(post.image, big, **big_options).url
+        thumbnail = get_thumbnail(post.image, small, **small_options)
+    except Exception:
+        # Как тег {% thumbnail %}: страница без картинки лучше ошибки
+        logger.exception('Не удалось получить превью %s', post.image.name)
+        return {}
+    # Если превью создать не удалось, sorl отдаёт его без размеров
+    width, height = thumbnail.size or (None, None)
+    return {
+        'big_url': big_url,
+        'thumbnail': thumbnail,
+        'width': width,
+        'height': height,
+    }
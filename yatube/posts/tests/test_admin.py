@@ -0,0 +1,274 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from .. import search
+from ..admin import RecentRelatedFieldListFilter
+from ..models import Comment, Follow, Group, Post, User
+from ..paginators import EstimatedCountPaginator
+
+CHANGELISTS = (
+    'admin:posts_post_changelist',
+    'admin:posts_comment_changelist',
+    'admin:posts_follow_changelist',
+)
+
+
+class ChangeListQueriesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(self.admin)
+        self.groups = [
+            Group.objects.create(title=f'Группа {i}', slug=f'group-{i}')
+            for i in range(3)
+        ]
+        self.rows = 0
+        self.add_rows(2)
+
+    def add_rows(self, count):
+        for _ in range(count):
+            self.rows += 1
+            author = User.objects.create_user(username=f'user-{self.rows}')
+            post = Post.objects.create(
+                author=author,
+                text=f'Пост {self.rows}',
+                group=self.groups[self.rows % 3],
+            )
+            Comment.objects.create(post=post, author=author, text='Текст')
+            Follow.objects.create(user=self.admin, author=author)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_queries_do_not_grow_with_rows(self):
+        """Число запросов страницы списка не зависит от числа строк."""
+        # Первые запросы заполняют кэши типов содержимого и счётчиков
+        for url in CHANGELISTS:
+            self.count_queries(url)
+        before = {url: self.count_queries(url) for url in CHANGELISTS}
+        self.add_rows(20)
+        for url in CHANGELISTS:
+            with self.subTest(url=url):
+                queries = self.count_queries(url)
+                self.assertEqual(queries, before[url])
+                self.assertLessEqual(queries, 10)
+
+    def test_group_column_uses_autocomplete(self):
+        """Столбец группы редактируется автодополнением с подписью."""
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertContains(
+            response, f'<option value="{self.groups[1].pk}" selected>'
+            f'{self.groups[1].title}</option>', html=True
+        )
+        self.assertNotContains(response, self.groups[0].title + '</option>')
+
+    def test_filter_choices_bounded(self):
+        """Фильтр по автору предлагает только недавних авторов."""
+        self.add_rows(5)
+        with mock.patch('posts.admin.ADMIN_FILTER_CHOICES', 3):
+            response = self.client.get(
+                reverse('admin:posts_follow_changelist')
+            )
+        spec = next(
+            spec for spec in response.context['cl'].filter_specs
+            if spec.field_path == 'author'
+        )
+        self.assertIsInstance(spec, RecentRelatedFieldListFilter)
+        self.assertEqual(
+            [label for _, label in spec.lookup_choices],
+            ['user-7', 'user-6', 'user-5'],
+        )
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост {i}') for i in range(30)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_statistics_used_for_large_tables(self):
+        """Большая таблица без фильтров считается по статистике."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        with self.settings(ADMIN_EXACT_COUNT_LIMIT=10):
+            EstimatedCountPaginator(Post.objects.all(), 10).count
+            paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+            with self.assertNumQueries(1):
+                self.assertEqual(paginator.count, 30)
+        with self.settings(ADMIN_EXACT_COUNT_LIMIT=100):
+            paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+            with self.assertNumQueries(2):
+                self.assertEqual(paginator.count, 30)
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=10)
+    def test_stale_statistics_capped_by_exact_count(self):
+        """Устаревшая статистика не прячет новые строки дольше кэша."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        author = User.objects.get(username='author')
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Новый пост {i}') for i in range(20)
+        )
+        self.assertEqual(
+            EstimatedCountPaginator(Post.objects.all(), 10).count, 50
+        )
+
+    def test_cached_count_without_statistics(self):
+        """Без статистики число строк кэшируется, фильтры — точно."""
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS sqlite_stat1')
+        EstimatedCountPaginator(Post.objects.all(), 10).count
+        Post.objects.filter(pk=Post.objects.first().pk).delete()
+        self.assertEqual(
+            EstimatedCountPaginator(Post.objects.all(), 10).count, 30
+        )
+        self.assertEqual(EstimatedCountPaginator(
+            Post.objects.filter(text__startswith='Пост'), 10
+        ).count, 29)
+
+
+class AdminSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.anna = User.objects.create_user(username='anna')
+        cls.annet = User.objects.create_user(username='annet')
+        cls.boris = User.objects.create_user(username='boris')
+        cls.post = Post.objects.create(author=cls.boris, text='Про погоду')
+        cls.comments = {
+            user.username: Comment.objects.create(
+                post=cls.post, author=user, text=text
+            )
+            for user, text in (
+                (cls.anna, 'Солнечная погода'),
+                (cls.annet, 'Дождь'),
+                (cls.boris, 'Снег и ветер'),
+            )
+        }
+        Follow.objects.create(user=cls.anna, author=cls.boris)
+        Follow.objects.create(user=cls.boris, author=cls.annet)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def search(self, url, term):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url), {'q': term})
+        self.assertEqual(response.status_code, 200)
+        for query in queries:
+            self.assertNotIn('LIKE', query['sql'])
+        return list(response.context['cl'].result_list)
+
+    def test_comment_search(self):
+        """Комментарии ищутся по словам текста и началу имени автора."""
+        found = self.search('admin:posts_comment_changelist', 'погода')
+        self.assertEqual(found, [self.comments['anna']])
+        found = self.search('admin:posts_comment_changelist', 'ann')
+        self.assertCountEqual(
+            found, [self.comments['anna'], self.comments['annet']]
+        )
+        self.assertEqual(
+            self.search('admin:posts_comment_changelist', 'нет такого'), []
+        )
+
+    def test_comment_ids_in_both_backends(self):
+        """Оба поисковых индекса находят комментарии по всем словам."""
+        for backend in ('fts5', 'python'):
+            if backend == 'fts5' and not search.fts5_available():
+                continue
+            with self.subTest(backend=backend), \
+                    self.settings(SEARCH_BACKEND=backend):
+                search.rebuild()
+                self.assertEqual(
+                    search.comment_ids('снег ветер', 10),
+                    [self.comments['boris'].pk],
+                )
+                self.assertEqual(search.comment_ids('снег дождь', 10), [])
+
+    def test_follow_search(self):
+        """Подписки ищутся по началу имени подписчика или автора."""
+        found = self.search('admin:posts_follow_changelist', 'annet')
+        self.assertEqual([follow.author for follow in found], [self.annet])
+        found = self.search('admin:posts_follow_changelist', 'bor')
+        self.assertEqual(len(found), 2)
+
+    def test_post_search_by_author(self):
+        """Посты ищутся и по тексту, и по началу имени автора."""
+        self.assertEqual(
+            self.search('admin:posts_post_changelist', 'bori'), [self.post]
+        )
+        self.assertEqual(
+            self.search('admin:posts_post_changelist', 'погоду'), [self.post]
+        )
+
+    def test_prefix_before_surrogates(self):
+        """Граница диапазона для U+D7FF перескакивает суррогаты."""
+        self.assertEqual(
+            self.search('admin:posts_post_changelist', 'bor\ud7ff'), []
+        )
+        queryset = User.objects.filter(search.prefix_q('username', '\ud7ff'))
+        self.assertFalse(queryset.exists())
+
+    def test_username_prefix_uses_index(self):
+        """Начало имени ищется по индексу, а не перебором таблицы."""
+        queryset = User.objects.filter(search.prefix_q('username', 'ann'))
+        self.assertEqual(
+            list(queryset.values_list('username', flat=True)),
+            ['anna', 'annet'],
+        )
+        with connection.cursor() as cursor:
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('SEARCH', plan)
+        self.assertIn('username', plan)
+
+
+class PostAddTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(self.admin)
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+    def test_add_post_with_author_and_image(self):
+        """Пост из админки создаётся с автором и обработанной картинкой."""
+        url = reverse('admin:posts_post_add')
+        self.assertContains(self.client.get(url), 'name="author"')
+        buffer = BytesIO()
+        Image.new('RGB', (300, 150), 'red').save(buffer, 'PNG')
+        with self.settings(MEDIA_ROOT=self.media_root, IMAGE_MAX_SIZE=100):
+            response = self.client.post(url, {
+                'text': 'Пост из админки',
+                'author': self.admin.pk,
+                'image': SimpleUploadedFile('photo.png', buffer.getvalue()),
+            })
+        self.assertEqual(response.status_code, 302)
+        post = Post.objects.get()
+        self.assertEqual(post.author, self.admin)
+        self.assertEqual((post.image_width, post.image_height), (100, 50))
@@ -0,0 +1,139 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from yatube.settings import NUM_OF_PAGES
+
+from ..models import Comment, Follow, Group, Post, User
+
+TEST_SLUG = 'test-slug'
+TEST_USERNAME = 'test-user'
+TEST_USERNAME_AUTHOR = 'test-author'
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=TEST_USERNAME)
+        cls.author = User.objects.create_user(username=TEST_USERNAME_AUTHOR)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=TEST_SLUG,
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Тестовый пост {i}', group=cls.group
+            )
+            for i in range(NUM_OF_PAGES + 1)
+        ]
+        cls.post = cls.posts[-1]
+        Comment.objects.create(
+            author=cls.user, post=cls.post, text='Тестовый комментарий'
+        )
+        cls.urls = [
+            reverse('posts:api_index'),
+            reverse('posts:api_group_list', kwargs={'slug': TEST_SLUG}),
+            reverse(
+                'posts:api_profile',
+                kwargs={'username': TEST_USERNAME_AUTHOR}
+            ),
+            reverse('posts:api_follow_index'),
+        ]
+        cls.detail_url = reverse(
+            'posts:api_post_detail', kwargs={'post_id': cls.post.pk}
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_feeds(self):
+        """Ленты отдают страницу постов, число постов и ссылку дальше."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                data = self.client.get(url).json()
+                self.assertEqual(data['count'], NUM_OF_PAGES + 1)
+                self.assertEqual(len(data['results']), NUM_OF_PAGES)
+                self.assertEqual(data['results'][0]['id'], self.post.pk)
+                self.assertEqual(
+                    data['results'][0]['group']['slug'], TEST_SLUG
+                )
+                self.assertIsNone(data['previous'])
+                second = self.client.get(data['next']).json()
+                self.assertEqual(len(second['results']), 1)
+                self.assertIsNone(second['next'])
+
+    def test_post_detail(self):
+        """Пост отдаётся вместе с комментариями."""
+        data = self.client.get(self.detail_url).json()
+        self.assertEqual(data['post']['text'], self.post.text)
+        self.assertEqual(data['post']['comments_count'], 1)
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']],
+            ['Тестовый комментарий'],
+        )
+
+    def test_not_modified(self):
+        """Совпавший If-None-Match и If-Modified-Since дают 304."""
+        for url in self.urls + [self.detail_url]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                not_modified = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(not_modified.status_code, 304)
+                self.assertEqual(not_modified.content, b'')
+                not_modified = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+                self.assertEqual(not_modified.status_code, 304)
+
+    def test_etag_changes_on_write(self):
+        """Новый комментарий меняет ETag ленты и поста."""
+        etags = {
+            url: self.client.get(url)['ETag']
+            for url in self.urls + [self.detail_url]
+        }
+        Comment.objects.create(
+            author=self.user, post=self.post, text='Новый комментарий'
+        )
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_kept_on_unrelated_write(self):
+        """Запись в другую группу не меняет ETag чужих лент."""
+        other = User.objects.create_user(username='other')
+        other_group = Group.objects.create(title='Другая', slug='other')
+        urls = self.urls[1:] + [self.detail_url]
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        other_post = Post.objects.create(
+            author=other, text='Пост другой группы', group=other_group
+        )
+        Comment.objects.create(
+            author=self.user, post=other_post, text='Комментарий'
+        )
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+        follow_url = self.urls[3]
+        response = self.client.get(follow_url)
+        Follow.objects.create(user=self.user, author=other)
+        changed = self.client.get(
+            follow_url,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+        self.assertEqual(changed.status_code, 200)
+
+    def test_follow_requires_login(self):
+        """Лента подписок без авторизации отвечает 401."""
+        self.client.logout()
+        response = self.client.get(reverse('posts:api_follow_index'))
+        self.assertEqual(response.status_code, 401)
+        self.assertNotIn('ETag', response)
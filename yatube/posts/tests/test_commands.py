@@ -0,0 +1,300 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import counters, search
+from ..models import Comment, Counter, Follow, Group, Post, User
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class LoadtestTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_seed_and_loadtest(self):
+        """Синтетические данные создаются, нагрузка проходит без ошибок."""
+        call_command(
+            'seed_data', users=5, groups=2, posts=30, comments=40, images=1,
+            image_ratio=0.5, stdout=StringIO(),
+        )
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Comment.objects.count(), 40)
+        self.assertEqual(counters.posts_count(), 30)
+        out = StringIO()
+        call_command(
+            'loadtest', clients=1, requests=30, warmup=5, stdout=out
+        )
+        for line in out.getvalue().splitlines()[1:-1]:
+            with self.subTest(line=line):
+                self.assertTrue(line.endswith(' 0'), line)
+        call_command(
+            'seed_data', users=0, groups=0, posts=0, comments=0, images=0,
+            clear=True, stdout=StringIO(),
+        )
+        self.assertFalse(Post.objects.exists())
+
+
+class ImportPostsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.directory = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def test_import(self):
+        """Посты из JSONL и CSV загружаются пачками с датами и группами."""
+        records = [
+            {
+                'text': 'Пост из JSONL',
+                'author': 'author',
+                'group': 'imported',
+                'group_title': 'Загруженная группа',
+                'pub_date': '2020-01-02T03:04:05',
+            },
+            {'text': 'Пост нового автора', 'author': 'newcomer',
+             'pub_date': '2020-01-03T00:00:00+00:00'},
+            {'text': 'Пост без автора'},
+        ]
+        jsonl = self.write(
+            'posts.jsonl', '\n'.join(json.dumps(row) for row in records)
+        )
+        csv_path = self.write(
+            'posts.csv',
+            'text,author,group,pub_date\n'
+            'Пост из CSV,author,imported,2020-01-04 00:00:00\n'
+        )
+        stderr = StringIO()
+        call_command(
+            'import_posts', jsonl, csv_path,
+            batch_size=2, keep_dates=True, create_missing=True,
+            stdout=StringIO(), stderr=stderr,
+        )
+        self.assertIn('posts.jsonl:3', stderr.getvalue())
+        self.assertEqual(Post.objects.count(), 3)
+        group = Group.objects.get(slug='imported')
+        self.assertEqual(group.title, 'Загруженная группа')
+        post = Post.objects.get(text='Пост из JSONL')
+        self.assertEqual(post.group, group)
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertTrue(
+            User.objects.filter(username='newcomer').exists()
+        )
+        self.assertEqual(counters.group_posts_count(group), 2)
+        self.assertEqual(counters.posts_count(), 3)
+
+    @override_settings(IMAGE_MAX_SIZE=100)
+    def test_images_processed(self):
+        """Картинки из --images-dir обрабатываются как при загрузке."""
+        Image.new('RGB', (300, 150), 'red').save(
+            os.path.join(self.directory, 'photo.png')
+        )
+        path = self.write('posts.jsonl', '\n'.join(json.dumps(row) for row in (
+            {'text': 'С картинкой', 'author': 'author', 'image': 'photo.png'},
+            {'text': 'Без файла', 'author': 'author', 'image': 'missing.png'},
+        )))
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        stderr = StringIO()
+        with self.settings(MEDIA_ROOT=media_root):
+            call_command(
+                'import_posts', path, images_dir=self.directory,
+                stdout=StringIO(), stderr=stderr,
+            )
+            post = Post.objects.get()
+            self.assertEqual((post.image_width, post.image_height), (100, 50))
+            self.assertTrue(post.image.name.endswith('.jpg'))
+            with Image.open(post.image.path) as image:
+                self.assertEqual(image.size, (100, 50))
+        self.assertIn('missing.png', stderr.getvalue())
+
+    @override_settings(FOLLOW_TIMELINE=True)
+    def test_derived_updated_for_imported_posts(self):
+        """Загрузка учитывает только новые посты и не пересчитывает всё."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.author)
+        Counter.objects.create(scope='author:0', value=42)
+        path = self.write('posts.jsonl', '\n'.join(json.dumps(row) for row in (
+            {'text': 'Загруженный пост', 'author': 'author'},
+            [1, 2],
+            'строка',
+        )))
+        stderr = StringIO()
+        call_command(
+            'import_posts', path, stdout=StringIO(), stderr=stderr,
+        )
+        self.assertIn('posts.jsonl:2', stderr.getvalue())
+        self.assertIn('posts.jsonl:3', stderr.getvalue())
+        post = Post.objects.get()
+        self.assertEqual(counters.author_posts_count(self.author), 1)
+        self.assertEqual(counters.get_count('author:0'), 42)
+        self.assertEqual(search.SearchResults('загруженный').count(), 1)
+        self.assertTrue(reader.timeline.filter(post=post).exists())
+
+    def test_unknown_author_skipped(self):
+        """Без --create-missing посты неизвестных авторов пропускаются."""
+        path = self.write(
+            'posts.jsonl', json.dumps({'text': 'Пост', 'author': 'stranger'})
+        )
+        call_command(
+            'import_posts', path, stdout=StringIO(), stderr=StringIO()
+        )
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(User.objects.filter(username='stranger').exists())
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group
+        )
+        Comment.objects.create(
+            author=cls.author, post=cls.post, text='Комментарий'
+        )
+        cls.directory = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_export_command(self):
+        """Команда выгружает посты в JSONL и сжатый CSV."""
+        out = StringIO()
+        call_command(
+            'export_data', 'posts', chunk_size=1, stdout=out, stderr=StringIO()
+        )
+        row = json.loads(out.getvalue())
+        self.assertEqual(row['text'], self.post.text)
+        self.assertEqual(row['author'], 'author')
+        self.assertEqual(row['group'], 'test-slug')
+        path = os.path.join(self.directory, 'comments.csv.gz')
+        call_command(
+            'export_data', 'comments', format='csv', gzip=True, output=path,
+            stderr=StringIO(),
+        )
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(rows[0]['text'], 'Комментарий')
+        self.assertEqual(int(rows[0]['post']), self.post.pk)
+
+    def test_export_round_trip(self):
+        """Выгруженные посты загружаются обратно командой import_posts."""
+        path = os.path.join(self.directory, 'posts.jsonl')
+        call_command(
+            'export_data', 'posts', output=path, stderr=StringIO()
+        )
+        call_command(
+            'import_posts', path, keep_dates=True, stdout=StringIO()
+        )
+        copy = Post.objects.exclude(pk=self.post.pk).get()
+        self.assertEqual(copy.text, self.post.text)
+        self.assertEqual(copy.group, self.group)
+        self.assertEqual(copy.pub_date, self.post.pub_date)
+
+    def test_admin_download(self):
+        """Админка отдаёт выгрузку потоком."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_follow_export'), {'format': 'csv'}
+        )
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            b''.join(response.streaming_content).decode().splitlines(),
+            ['user,author'],
+        )
+        response = self.client.post(
+            reverse('admin:posts_post_changelist'),
+            {'action': 'export_jsonl', '_selected_action': [self.post.pk]},
+        )
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(json.loads(content)['id'], self.post.pk)
+
+
+class DbBenchmarkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    def test_db_benchmark(self):
+        """Нагрузочный тест базы отчитывается и убирает за собой."""
+        out = StringIO()
+        call_command(
+            'db_benchmark', processes=1, duration=0.2, write_ratio=0.5,
+            stdout=out,
+        )
+        self.assertIn('чтение', out.getvalue())
+        self.assertIn('запись', out.getvalue())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(User.objects.filter(username='db-benchmark'))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), IMAGE_MAX_SIZE=100)
+class ProcessImagesTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_process_images_command(self):
+        """manage.py process_images обрабатывает старые картинки."""
+        author = User.objects.create_user(username='author')
+        buffer = BytesIO()
+        Image.new('RGB', (300, 300), 'blue').save(buffer, 'PNG')
+        name = default_storage.save(
+            'posts/old.png', ContentFile(buffer.getvalue())
+        )
+        posts = [
+            Post.objects.create(author=author, text='Старый', image=name)
+            for _ in range(2)
+        ]
+        call_command('process_images', stdout=StringIO())
+        for post in posts:
+            post.refresh_from_db()
+            self.assertRegex(
+                post.image.name,
+                r'posts/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$',
+            )
+            self.assertEqual(post.image_width, 100)
+        self.assertFalse(default_storage.exists(name))
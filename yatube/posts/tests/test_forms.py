@@ -1,10 +1,15 @@
+import hashlib
 import shutil
 import tempfile
+from io import BytesIO
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from sorl.thumbnail import default
+from PIL import Image
+from sorl.thumbnail.images import ImageFile
 
 from ..models import Comment, Group, Post, User
 
@@ -24,6 +29,12 @@ TEST_GIF = (
     b'\x0A\x00\x3B'
 )
 
+# Теги EXIF
+ORIENTATION = 0x0112
+MAKE = 0x010F
+
+BLOB = r'posts/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}'
+
 POST_DETAIL = 'posts:post_detail'
 PROFILE = 'posts:profile'
 POST_CREATE = 'posts:post_create'
@@ -31,6 +42,11 @@ POST_EDIT = 'posts:post_edit'
 POST_ADD_COMMENT = 'posts:add_comment'
 
 
+def blob_name(content, extension):
+    digest = hashlib.sha256(content).hexdigest()
+    return f'posts/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostViewsTests(TestCase):
     @classmethod
@@ -126,10 +142,30 @@ class PostViewsTests(TestCase):
         self.assertEqual(Post.objects.count(), posts_count + 1)
         self.assertTrue(
             Post.objects.filter(
-                image='posts/test.gif',
+                image=blob_name(TEST_GIF, '.gif'),
             ).exists()
         )
 
+    @override_settings(TASKS_EAGER=True)
+    def test_thumbnails_generated_on_upload(self):
+        """Превью всех размеров создаются при загрузке картинки."""
+        uploaded = SimpleUploadedFile(
+            name='thumb.gif',
+            content=TEST_GIF,
+            content_type='image/gif'
+        )
+        self.authorized_client.post(
+            reverse(POST_CREATE),
+            data={'text': CREATED_POST_TEXT, 'image': uploaded},
+        )
+        post = Post.objects.get(image=blob_name(TEST_GIF, '.gif'))
+        thumbnails = default.kvstore._get(
+            ImageFile(post.image).key, identity='thumbnails'
+        )
+        self.assertEqual(
+            len(thumbnails), len(settings.THUMBNAIL_GEOMETRIES)
+        )
+
     def test_comment_saved(self):
         """Редирект и добавление в БД после отправления комментария."""
         comment_count = Comment.objects.count()
@@ -154,3 +190,79 @@ class PostViewsTests(TestCase):
                 text=TEST_COMMENT_TEXT,
             ).exists()
         )
+
+
+def image_upload(name, image, image_format, **options):
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_SIZE=100)
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=TEST_USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def create_post(self, upload):
+        response = self.client.post(
+            reverse(POST_CREATE),
+            data={'text': CREATED_POST_TEXT, 'image': upload},
+        )
+        return response, Post.objects.filter(author=self.user).first()
+
+    def test_photo_resized_and_reencoded(self):
+        """Фото уменьшается, поворачивается по EXIF и теряет метаданные."""
+        exif = Image.Exif()
+        exif[ORIENTATION] = 6
+        exif[MAKE] = 'Телефон'
+        _, post = self.create_post(image_upload(
+            'photo.png', Image.new('RGB', (400, 200), 'red'), 'PNG',
+            exif=exif.tobytes(),
+        ))
+        self.assertRegex(post.image.name, BLOB + r'\.jpg$')
+        # После поворота на 90° картинка стала вертикальной
+        self.assertEqual((post.image_width, post.image_height), (50, 100))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (50, 100))
+            self.assertTrue(image.info.get('progressive'))
+            self.assertNotIn('exif', image.info)
+
+    def test_transparency_kept(self):
+        """Прозрачная картинка сохраняется в PNG с альфа-каналом."""
+        _, post = self.create_post(image_upload(
+            'logo.png', Image.new('RGBA', (60, 30), (0, 0, 0, 0)), 'PNG'
+        ))
+        self.assertRegex(post.image.name, BLOB + r'\.png$')
+        self.assertEqual((post.image_width, post.image_height), (60, 30))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.mode, 'RGBA')
+
+    def test_gif_kept_as_is(self):
+        """GIF в допустимых размерах сохраняется без изменений."""
+        _, post = self.create_post(
+            SimpleUploadedFile('anim.gif', TEST_GIF, 'image/gif')
+        )
+        self.assertEqual(post.image.name, blob_name(TEST_GIF, '.gif'))
+        self.assertEqual((post.image_width, post.image_height), (2, 1))
+        with open(post.image.path, 'rb') as file:
+            self.assertEqual(file.read(), TEST_GIF)
+
+    @override_settings(IMAGE_MAX_PIXELS=1000)
+    def test_too_many_pixels_rejected(self):
+        """Слишком большая картинка отклоняется до декодирования."""
+        response, post = self.create_post(image_upload(
+            'huge.png', Image.new('RGB', (100, 100)), 'PNG'
+        ))
+        self.assertIsNone(post)
+        self.assertIn('image', response.context['form'].errors)
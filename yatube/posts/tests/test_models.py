@@ -1,6 +1,11 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Comment, Follow, Group, Post, User
+from .. import counters
+from ..models import Comment, Counter, Follow, Group, Post, User
 
 VERBOSE_NAMES = [
     {
@@ -97,3 +102,92 @@ class ModelsTest(TestCase):
                         self.models[i]._meta.get_field(field).help_text,
                         expected_value,
                     )
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def assertCountersMatch(self):
+        expected = {
+            counters.ALL_POSTS: Post.objects.count(),
+            counters.author_scope(self.author.pk): (
+                self.author.posts.count()
+            ),
+            counters.group_scope(self.group.pk): (
+                self.group.group_posts.count()
+            ),
+            counters.group_scope(self.other_group.pk): (
+                self.other_group.group_posts.count()
+            ),
+        }
+        cache.clear()
+        self.assertEqual(counters.get_counts(list(expected)), expected)
+
+    def test_counters_follow_writes(self):
+        """Счётчики постов совпадают с таблицей после изменений."""
+        post = Post.objects.create(
+            author=self.author, text='Тестовый пост', group=self.group
+        )
+        Post.objects.create(author=self.author, text='Второй пост')
+        self.assertCountersMatch()
+        post.group = self.other_group
+        post.save()
+        self.assertCountersMatch()
+        post.delete()
+        self.assertCountersMatch()
+
+    def test_comments_count(self):
+        """comments_count поста меняется вместе с комментариями."""
+        post = Post.objects.create(author=self.author, text='Тестовый пост')
+        comment = Comment.objects.create(
+            text='Комментарий', post=post, author=self.user
+        )
+        Comment.objects.create(text='Комментарий', post=post, author=self.user)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 2)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_rebuild(self):
+        """Пересчёт восстанавливает разошедшиеся счётчики."""
+        post = Post.objects.create(
+            author=self.author, text='Тестовый пост', group=self.group
+        )
+        Comment.objects.create(text='Комментарий', post=post, author=self.user)
+        Counter.objects.update(value=100)
+        Post.objects.update(comments_count=100)
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertCountersMatch()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_feed_count(self):
+        """Размер ленты подписок равен сумме постов авторов."""
+        Post.objects.create(author=self.author, text='Тестовый пост')
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(counters.feed_posts_count(self.user), 1)
+
+    def test_counter_read_skips_posts_table(self):
+        """Повторное чтение счётчика не обращается к базе."""
+        Post.objects.create(author=self.author, text='Тестовый пост')
+        counters.posts_count()
+        with self.assertNumQueries(0):
+            self.assertEqual(counters.posts_count(), 1)
@@ -0,0 +1,150 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import counters, search
+from ..management.commands.moderate import OPERATIONS
+from ..models import Comment, Group, Post, User
+
+
+class ModerationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.spammer = User.objects.create_user(username='spammer')
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.other_group = Group.objects.create(title='Другая', slug='other')
+        self.posts = [
+            Post.objects.create(
+                author=self.spammer, text=f'Спам реклама {i}',
+                group=self.group,
+            )
+            for i in range(5)
+        ]
+        self.post = Post.objects.create(
+            author=self.author, text='Обычный пост', group=self.group
+        )
+        for post in self.posts[:2] + [self.post]:
+            Comment.objects.create(
+                post=post, author=self.spammer, text='Купите реклама'
+            )
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Ответ автора'
+        )
+
+    def assertCountersMatch(self):
+        scopes = [counters.ALL_POSTS] + [
+            counters.group_scope(group.pk)
+            for group in (self.group, self.other_group)
+        ] + [
+            counters.author_scope(user.pk)
+            for user in (self.spammer, self.author)
+        ]
+        cache.clear()
+        self.assertEqual(counters.get_counts(scopes), {
+            scope: counters._queryset(scope).count() for scope in scopes
+        })
+
+    def moderate(self, *args, **options):
+        out = StringIO()
+        call_command('moderate', *args, batch_size=2, stdout=out, **options)
+        return out.getvalue()
+
+    def test_move_posts(self):
+        """Посты переносятся между группами пачками, счётчики верны."""
+        out = self.moderate(
+            'move-posts', author='spammer', to_group='other'
+        )
+        self.assertIn('Обработано 4 из 5', out)
+        self.assertEqual(self.other_group.group_posts.count(), 5)
+        self.assertEqual(self.group.group_posts.count(), 1)
+        self.assertCountersMatch()
+        self.moderate('move-posts', group='other')
+        self.assertEqual(Post.objects.filter(group=None).count(), 5)
+        self.assertCountersMatch()
+
+    def test_delete_posts(self):
+        """Посты удаляются с комментариями, индексом и счётчиками."""
+        self.assertEqual(search.SearchResults('реклама').count(), 6)
+        out = self.moderate('delete-posts', author='spammer')
+        self.assertIn('Удалено постов: 5', out)
+        self.assertEqual(list(Post.objects.all()), [self.post])
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertEqual(search.SearchResults('реклама').count(), 1)
+        self.assertCountersMatch()
+
+    def test_delete_comments(self):
+        """Удаление комментариев обновляет comments_count и индекс."""
+        self.moderate(
+            'delete-comments', author='spammer',
+            since=self.post.pub_date.date().isoformat(),
+        )
+        self.assertEqual(
+            list(Comment.objects.values_list('text', flat=True)),
+            ['Ответ автора'],
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(search.comment_ids('купите', 10), [])
+
+    def test_requires_condition(self):
+        """Операции без условий отбора и --dry-run ничего не меняют."""
+        for operation in OPERATIONS:
+            with self.subTest(operation=operation):
+                with self.assertRaises(CommandError):
+                    self.moderate(operation)
+        with self.assertRaises(CommandError):
+            self.moderate('move-posts', to_group='other')
+        self.assertEqual(self.group.group_posts.count(), 6)
+        out = self.moderate('delete-comments', author='spammer', dry_run=True)
+        self.assertIn('Будет затронуто записей: 3', out)
+        self.assertEqual(Comment.objects.count(), 4)
+
+    def test_options_of_other_operation_rejected(self):
+        """Условие, не применимое к операции, не считается отбором."""
+        for operation in ('delete-posts', 'move-posts'):
+            with self.subTest(operation=operation):
+                with self.assertRaises(CommandError):
+                    self.moderate(operation, post=self.post.pk, dry_run=True)
+        with self.assertRaises(CommandError):
+            self.moderate('delete-comments', to_group='other', dry_run=True)
+        self.assertEqual(Post.objects.count(), 6)
+
+    def test_delete_comments_by_group(self):
+        """--group отбирает комментарии по группе поста."""
+        Post.objects.filter(pk=self.post.pk).update(group=self.other_group)
+        out = self.moderate('delete-comments', group='group', dry_run=True)
+        self.assertIn('Будет затронуто записей: 2', out)
+        self.moderate('delete-comments', group='other')
+        self.assertEqual(
+            Comment.objects.filter(post=self.post).count(), 0
+        )
+        self.assertEqual(Comment.objects.count(), 2)
+
+    def test_admin_actions(self):
+        """Действия админки переносят и удаляют выбранное пачками."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        url = reverse('admin:posts_post_changelist')
+        selected = [post.pk for post in self.posts]
+        self.client.post(url, {
+            'action': 'move_to_group', 'group': self.other_group.pk,
+            '_selected_action': selected,
+        })
+        self.assertEqual(self.other_group.group_posts.count(), 5)
+        response = self.client.post(url, {
+            'action': 'delete_batched', '_selected_action': selected,
+        })
+        self.assertContains(response, 'Будет удалено: 5')
+        self.assertEqual(Post.objects.count(), 6)
+        self.client.post(url, {
+            'action': 'delete_batched', '_selected_action': selected,
+            'post': 'yes',
+        })
+        self.assertEqual(list(Post.objects.all()), [self.post])
+        self.assertCountersMatch()
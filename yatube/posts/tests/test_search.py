@@ -0,0 +1,62 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Post
+from ..search import FTS5Backend, PythonBackend, SearchResults, get_backend
+
+User = get_user_model()
+
+SEARCH = 'posts:search'
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.apples = Post.objects.create(
+            author=self.user, text='Яблоки и груши, яблоки снова'
+        )
+        self.pears = Post.objects.create(
+            author=self.user, text='Только груши'
+        )
+        self.comment = Comment.objects.create(
+            author=self.user, post=self.pears, text='Сливы в комментарии'
+        )
+        self.pears.refresh_from_db()
+
+    def check_backend(self):
+        results = SearchResults('груши')
+        self.assertEqual(results.count(), 2)
+        self.assertCountEqual(results[0:10], [self.apples, self.pears])
+        self.assertEqual(SearchResults('яблоки груши')[0:10], [self.apples])
+        self.assertEqual(SearchResults('сливы')[0:10], [self.pears])
+        self.assertEqual(SearchResults('вишни').count(), 0)
+        self.pears.text = 'Теперь вишни'
+        self.pears.save()
+        self.assertEqual(SearchResults('вишни')[0:10], [self.pears])
+        self.comment.delete()
+        self.assertEqual(SearchResults('сливы').count(), 0)
+
+    def test_default_backend_is_fts5(self):
+        """На SQLite с FTS5 используется FTS5."""
+        self.assertIsInstance(get_backend(), FTS5Backend)
+
+    def test_fts5_backend(self):
+        """FTS5 находит посты по тексту и комментариям."""
+        self.check_backend()
+
+    @override_settings(SEARCH_BACKEND='python')
+    def test_python_backend(self):
+        """Запасной индекс находит посты по тексту и комментариям."""
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertIsInstance(get_backend(), PythonBackend)
+        self.check_backend()
+
+    def test_search_page(self):
+        """Страница поиска выводит найденные посты."""
+        response = self.client.get(reverse(SEARCH), {'q': 'яблоки'})
+        self.assertEqual(list(response.context['page_obj']), [self.apples])
+        self.assertContains(response, self.apples.text)
@@ -1,15 +1,21 @@
 import shutil
 import tempfile
+from io import StringIO
 
 from django import forms
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from yatube.settings import NUM_OF_PAGES
 
-from ..models import Comment, Follow, Group, Post, User
+from .. import timeline
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -23,6 +29,7 @@ GROUP_LIST = 'posts:group_list'
 POST_DETAIL = 'posts:post_detail'
 PROFILE = 'posts:profile'
 POST_EDIT = 'posts:post_edit'
+POST_COMMENTS = 'posts:post_comments'
 FOLLOW_INDEX = 'posts:follow_index'
 PROFILE_FOLLOW = 'posts:profile_follow'
 PROFILE_UNFOLLOW = 'posts:profile_unfollow'
@@ -141,6 +148,19 @@ class PostViewsTests(TestCase):
             self.post.image
         )
 
+    def test_image_uses_stored_size(self):
+        """Картинка по размерам из поста выводится без крупной копии."""
+        url = self.reverses[3]
+        response = self.authorized_client.get(url)
+        self.assertNotContains(response, f'href="{self.post.image.url}"')
+        self.assertContains(response, 'width="300" height="300"')
+        Post.objects.filter(pk=self.post.pk).update(
+            image_width=2, image_height=1
+        )
+        cache.clear()
+        response = self.authorized_client.get(url)
+        self.assertContains(response, f'href="{self.post.image.url}"')
+
     def test_context_on_post_create(self):
         """На страницу создания нового поста передается нужный контекст."""
         response = self.authorized_client.get(self.reverses[5])
@@ -164,14 +184,70 @@ class PostViewsTests(TestCase):
         self.assertContains(response, test_comment.text)
 
     def test_cache_index(self):
-        """Кэширование сохраняет контент на 20 секунд."""
+        """Кэширование сохраняет контент, пока посты не менялись."""
         response = self.authorized_client.get(self.reverses[0])
         content = response.content
-        Post.objects.all().delete()
+        # update() не вызывает сигналов и не сбрасывает кэш
+        Post.objects.update(text='Изменённый в обход сигналов пост')
         response_new = self.authorized_client.get(self.reverses[0])
         content_new = response_new.content
         self.assertEqual(content, content_new)
 
+    def test_cache_invalidated_on_write(self):
+        """Новый пост появляется на закэшированных страницах сразу."""
+        for url in self.reverses[:3]:
+            self.authorized_client.get(url)
+        new_post = Post.objects.create(
+            author=self.user,
+            text='Пост после кэширования',
+            group=self.group,
+        )
+        for url in self.reverses[:3]:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, new_post.text)
+
+    def test_cache_kept_for_other_scopes(self):
+        """Запись сбрасывает только ленты, в которые она попадает."""
+        group_url, profile_url = self.reverses[1], self.reverses[2]
+        other_group = Group.objects.create(title='Другая', slug='other')
+        cached = {
+            url: self.authorized_client.get(url).content
+            for url in (group_url, profile_url)
+        }
+        Post.objects.update(text='Изменённый в обход сигналов пост')
+        other_post = Post.objects.create(
+            author=self.author, text='Пост другой группы', group=other_group
+        )
+        Comment.objects.create(
+            author=self.user, post=other_post, text='Комментарий'
+        )
+        Follow.objects.create(user=self.author, author=self.user)
+        for url in (group_url, profile_url):
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertEqual(response.content, cached[url])
+        Comment.objects.create(
+            author=self.author, post=self.post, text='Комментарий'
+        )
+        for url in (group_url, profile_url):
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'в обход сигналов')
+
+    def test_cache_varies_on_page(self):
+        """Каждая страница ленты кэшируется отдельно."""
+        for i in range(NUM_OF_PAGES):
+            Post.objects.create(
+                author=self.user,
+                text=f'Пост для второй страницы {i}',
+                group=self.group,
+            )
+        first = self.authorized_client.get(self.reverses[0])
+        second = self.authorized_client.get(self.reverses[0], {'page': 2})
+        self.assertNotEqual(first.content, second.content)
+        self.assertContains(second, self.post.text)
+
     def test_user_can_follow(self):
         """Возможность подписки."""
         self.authorized_client.post(self.reverses[6])
@@ -228,3 +304,348 @@ class PostViewsTests(TestCase):
                     response.context['page_obj']),
                     NUM_OF_PAGES
                 )
+
+
+@override_settings(POSTS_PAGINATION='cursor')
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=TEST_USERNAME)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=TEST_SLUG,
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user,
+                text=f'Тестовый пост {i}',
+                group=cls.group,
+            )
+            for i in range(NUM_OF_PAGES + 3)
+        ]
+        cls.reverses = [
+            reverse(INDEX),
+            reverse(GROUP_LIST, kwargs={'slug': TEST_SLUG}),
+            reverse(PROFILE, kwargs={'username': TEST_USERNAME}),
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_cursor_pages(self):
+        """Курсор ведёт на следующую страницу и обратно без пропусков."""
+        newest_first = self.posts[::-1]
+        for url in self.reverses:
+            with self.subTest(url=url):
+                first = self.client.get(url).context['page_obj']
+                self.assertEqual(list(first), newest_first[:NUM_OF_PAGES])
+                self.assertFalse(first.has_previous())
+                second = self.client.get(
+                    url, {'cursor': first.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(second), newest_first[NUM_OF_PAGES:])
+                self.assertFalse(second.has_next())
+                back = self.client.get(
+                    url, {'cursor': second.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back), newest_first[:NUM_OF_PAGES])
+                self.assertFalse(back.has_previous())
+
+    def test_invalid_cursor(self):
+        """Некорректный курсор открывает первую страницу."""
+        response = self.client.get(self.reverses[0], {'cursor': 'broken'})
+        self.assertEqual(
+            list(response.context['page_obj']),
+            self.posts[::-1][:NUM_OF_PAGES]
+        )
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentsPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=TEST_USERNAME)
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        cls.comments = [
+            Comment.objects.create(
+                author=User.objects.create_user(username=f'commenter-{i}'),
+                post=cls.post,
+                text=f'Комментарий {i}',
+            )
+            for i in range(5)
+        ]
+        cls.url = reverse(POST_DETAIL, kwargs={'post_id': cls.post.pk})
+
+    def test_comments_paginated(self):
+        """Под постом первая порция комментариев, остальные по курсору."""
+        first = self.client.get(self.url).context['comments']
+        self.assertEqual(list(first), self.comments[:3])
+        self.assertTrue(first.has_next())
+        response = self.client.get(
+            reverse(POST_COMMENTS, kwargs={'post_id': self.post.pk}),
+            {'comments': first.next_cursor},
+        )
+        self.assertEqual(list(response.context['comments']), self.comments[3:])
+        self.assertFalse(response.context['comments'].has_next())
+        self.assertContains(response, self.comments[4].text)
+        self.assertNotContains(response, self.comments[0].text)
+
+    def test_comment_queries_do_not_depend_on_comments(self):
+        """Число запросов страницы поста не растёт с числом комментариев."""
+        cache.clear()
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        Comment.objects.create(
+            author=User.objects.create_user(username='commenter-new'),
+            post=self.post,
+            text='Ещё комментарий',
+        )
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as more_queries:
+            self.client.get(self.url)
+        self.assertEqual(len(more_queries), len(queries))
+
+
+class HttpCachingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=TEST_USERNAME)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=TEST_SLUG,
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый пост', group=cls.group
+        )
+        cls.profile_url = reverse(
+            PROFILE, kwargs={'username': TEST_USERNAME}
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    @override_settings(HTTP_CACHE_MAX_AGE=60)
+    def test_guest_feeds_cached_publicly(self):
+        """Гостю главная и группа отдаются как public с max-age."""
+        urls = [
+            reverse(INDEX),
+            reverse(GROUP_LIST, kwargs={'slug': TEST_SLUG}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('max-age=60', response['Cache-Control'])
+                self.assertIn('Cookie', response['Vary'])
+
+    def test_user_pages_private(self):
+        """Авторизованному пользователю страницы отдаются как private."""
+        urls = [
+            reverse(INDEX),
+            self.profile_url,
+            reverse(POST_DETAIL, kwargs={'post_id': self.post.pk}),
+            reverse(FOLLOW_INDEX),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertIn('private', response['Cache-Control'])
+                self.assertIn('no-cache', response['Cache-Control'])
+                self.assertIn('Cookie', response['Vary'])
+
+    def test_profile_revalidated(self):
+        """Профиль перепроверяется по ETag и отдаёт 304 без шаблона."""
+        response = self.client.get(self.profile_url)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertNotEqual(
+            self.authorized_client.get(self.profile_url)['ETag'],
+            response['ETag'],
+        )
+        not_modified = self.client.get(
+            self.profile_url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertTemplateNotUsed(not_modified, 'posts/profile.html')
+        Post.objects.create(author=self.user, text='Новый пост')
+        modified = self.client.get(
+            self.profile_url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(modified.status_code, 200)
+
+
+class FeedQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=TEST_USERNAME)
+        cls.author = User.objects.create_user(username=TEST_USERNAME_AUTHOR)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=TEST_SLUG,
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group
+        )
+        cls.reverses = [
+            reverse(INDEX),
+            reverse(GROUP_LIST, kwargs={'slug': TEST_SLUG}),
+            reverse(PROFILE, kwargs={'username': TEST_USERNAME_AUTHOR}),
+            reverse(FOLLOW_INDEX),
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return len(queries)
+
+    def test_feed_queries_do_not_depend_on_posts(self):
+        """Число запросов страницы ленты не растёт с числом постов."""
+        single = {url: self.count_queries(url) for url in self.reverses}
+        for i in range(NUM_OF_PAGES):
+            author = User.objects.create_user(username=f'author-{i}')
+            Follow.objects.create(user=self.user, author=author)
+            # Посты автора профиля заполняют и его страницу
+            for post_author in (author, self.author):
+                post = Post.objects.create(
+                    author=post_author, text='Тестовый пост',
+                    group=self.group,
+                )
+                Comment.objects.create(
+                    author=self.user, post=post, text='Комментарий'
+                )
+        for url in self.reverses:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), single[url])
+
+    def test_counts_without_aggregate_queries(self):
+        """Число постов автора выводится без COUNT по таблице постов."""
+        post = self.author.posts.first()
+        urls = [
+            reverse(POST_DETAIL, kwargs={'post_id': post.pk}),
+            reverse(PROFILE, kwargs={'username': TEST_USERNAME_AUTHOR}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.client.get(url)
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(url)
+                self.assertFalse([
+                    query['sql'] for query in queries
+                    if 'COUNT(' in query['sql']
+                ])
+
+    def test_feeds_read_ordered_indexes(self):
+        """Ленты группы и автора читаются по составным индексам."""
+        out = StringIO()
+        call_command('explain_feeds', repeat=1, stdout=out)
+        plans = out.getvalue()
+        self.assertIn('posts_post_group_date', plans)
+        self.assertIn('posts_post_author_date', plans)
+        self.assertIn('posts_follow_user_author', plans)
+        self.assertNotIn('TEMP B-TREE', plans.split('follow_index')[0])
+
+
+@override_settings(
+    FOLLOW_TIMELINE=True, FOLLOW_TIMELINE_LENGTH=3, TASKS_EAGER=True
+)
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=TEST_USERNAME)
+        cls.author = User.objects.create_user(username=TEST_USERNAME_AUTHOR)
+        cls.old_post = Post.objects.create(
+            author=cls.author, text='Пост до подписки'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get_feed(self):
+        cache.clear()
+        response = self.client.get(reverse(FOLLOW_INDEX))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка заполняет ленту, отписка очищает её."""
+        self.client.get(
+            reverse(PROFILE_FOLLOW, kwargs={'username': TEST_USERNAME_AUTHOR})
+        )
+        self.assertEqual(self.get_feed(), [self.old_post])
+        self.client.get(
+            reverse(
+                PROFILE_UNFOLLOW, kwargs={'username': TEST_USERNAME_AUTHOR}
+            )
+        )
+        self.assertEqual(self.get_feed(), [])
+        self.assertFalse(self.user.timeline.exists())
+
+    def test_new_post_fanned_out_and_bounded(self):
+        """Новые посты попадают в ленту, старые вытесняются."""
+        Follow.objects.create(user=self.user, author=self.author)
+        new_posts = [
+            Post.objects.create(author=self.author, text=f'Новый пост {i}')
+            for i in range(3)
+        ]
+        self.assertEqual(self.get_feed(), new_posts[::-1])
+        self.assertEqual(self.user.timeline.count(), 3)
+
+    def test_trim_is_one_query(self):
+        """Ленты многих подписчиков обрезаются одним запросом."""
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(5)
+        ]
+        users = [
+            User.objects.create_user(username=f'reader-{i}') for i in range(4)
+        ]
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(
+                user=user, post=post, author=self.author,
+                pub_date=post.pub_date,
+            )
+            for user in users for post in posts
+        )
+        with self.assertNumQueries(1):
+            timeline.trim([user.pk for user in users])
+        for user in users:
+            self.assertEqual(
+                list(user.timeline.values_list('post', flat=True)),
+                [post.pk for post in posts[:1:-1]],
+            )
+
+    @override_settings(FOLLOW_TIMELINE_LENGTH=50, POSTS_PAGINATION='cursor')
+    def test_feed_read_by_timeline_index(self):
+        """Лента читается по индексу записей ленты, в том числе курсором."""
+        Follow.objects.create(user=self.user, author=self.author)
+        posts = [self.old_post] + [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(12)
+        ]
+        plan = timeline.feed(self.user)[:10].explain()
+        self.assertIn('posts_timeline_user_date_post', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+        cache.clear()
+        response = self.client.get(reverse(FOLLOW_INDEX))
+        page = response.context['page_obj']
+        self.assertEqual(list(page), posts[:2:-1])
+        response = self.client.get(
+            reverse(FOLLOW_INDEX), {'cursor': page.next_cursor}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']), posts[2::-1]
+        )
@@ -0,0 +1,33 @@
+import logging
+
+from django.conf import settings
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from core.storage import media_storage
+
+logger = logging.getLogger(__name__)
+
+
+def generate(image):
+    """Создаёт превью всех размеров из settings.THUMBNAIL_GEOMETRIES.
+
+    get_thumbnail сохраняет превью в хранилище ключ-значение sorl,
+    после чего тег {% thumbnail %} с теми же параметрами берёт готовый
+    результат и не открывает картинку. Имя без хранилища ищется в
+    хранилище картинок постов. Возвращает число превью.
+    """
+    name = getattr(image, 'name', image)
+    if not name:
+        return 0
+    if isinstance(image, str):
+        # Ключи sorl зависят от хранилища: превью должны совпасть с теми,
+        # что ищет шаблон для post.image
+        image = ImageFile(image, media_storage)
+    storage = image.storage
+    if not storage.exists(name):
+        logger.warning('Картинка %s не найдена, превью не созданы', name)
+        return 0
+    for geometry, options in settings.THUMBNAIL_GEOMETRIES:
+        get_thumbnail(image, geometry, **options)
+    return len(settings.THUMBNAIL_GEOMETRIES)
@@ -0,0 +1,107 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+
+from .models import Follow, Post, TimelineEntry
+
+
+def _entries(user_id, posts):
+    return [
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for post in posts
+    ]
+
+
+def trim(user_ids):
+    """Оставляет в лентах только FOLLOW_TIMELINE_LENGTH новых записей.
+
+    Лишние записи всех лент удаляются одним DELETE на пачку
+    пользователей: номер записи в ленте считает оконная функция по
+    индексу (user, -pub_date, -post).
+    """
+    table = TimelineEntry._meta.db_table
+    user_ids = list(user_ids)
+    size = settings.FOLLOW_TIMELINE_BATCH_SIZE
+    with connection.cursor() as cursor:
+        for start in range(0, len(user_ids), size):
+            batch = user_ids[start:start + size]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(
+                f'DELETE FROM {table} WHERE id IN ('
+                f'SELECT id FROM (SELECT id, ROW_NUMBER() OVER ('
+                f'PARTITION BY user_id ORDER BY pub_date DESC, post_id DESC'
+                f') AS position FROM {table} '
+                f'WHERE user_id IN ({placeholders})) AS numbered '
+                f'WHERE position > %s)',
+                batch + [settings.FOLLOW_TIMELINE_LENGTH],
+            )
+
+
+def fan_out(post):
+    """Добавляет новый пост в ленты всех подписчиков автора."""
+    fan_out_many([post])
+
+
+def fan_out_many(posts):
+    """Добавляет новые посты в ленты подписчиков их авторов."""
+    followers = defaultdict(list)
+    follows = Follow.objects.filter(
+        author_id__in={post.author_id for post in posts}
+    ).values_list('author_id', 'user_id')
+    for author_id, user_id in follows:
+        followers[author_id].append(user_id)
+    entries = []
+    for post in posts:
+        for user_id in followers[post.author_id]:
+            entries.extend(_entries(user_id, [post]))
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=settings.FOLLOW_TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    trim({user_id for users in followers.values() for user_id in users})
+
+
+def backfill(user_id, author_id):
+    """Заполняет ленту последними постами автора после подписки."""
+    posts = Post.objects.filter(author_id=author_id).only(
+        'pk', 'author_id', 'pub_date'
+    ).order_by('-pub_date', '-pk')[:settings.FOLLOW_TIMELINE_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        _entries(user_id, posts),
+        batch_size=settings.FOLLOW_TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    trim([user_id])
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild():
+    """Собирает все ленты заново по текущим подпискам."""
+    TimelineEntry.objects.all().delete()
+    follows = Follow.objects.values_list('user_id', 'author_id')
+    for user_id, author_id in follows.iterator():
+        backfill(user_id, author_id)
+
+
+def feed(user):
+    """Посты ленты подписок для карточек из материализованной ленты.
+
+    Порядок задают поля записи ленты, а не поста, чтобы страница
+    читалась диапазоном индекса (user, -pub_date, -post) без сортировки.
+    """
+    return Post.objects.filter(timeline_entries__user=user).for_feed(
+    ).annotate(
+        timeline_date=F('timeline_entries__pub_date'),
+        timeline_post=F('timeline_entries__post'),
+    ).order_by('-timeline_date', '-timeline_post')
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+
+from . import fragments, timeline
+from .models import Post
+from .paginators import CountedPaginator, CursorPaginator
+
+
+def follow_posts(user):
+    """Посты авторов, на которых подписан пользователь, для ленты."""
+    if settings.FOLLOW_TIMELINE:
+        return timeline.feed(user)
+    return Post.objects.filter(author__following__user=user).for_feed()
+
+
+def get_page_obj(request, post_list, count=None):
+    """Страница ленты в режиме, выбранном в settings.POSTS_PAGINATION.
+
+    count — число постов ленты или функция, возвращающая его; без него
+    нумерованный режим считает посты через COUNT(*).
+    """
+    if settings.POSTS_PAGINATION == 'cursor':
+        paginator = CursorPaginator(post_list, settings.NUM_OF_PAGES)
+        return paginator.get_page(request.GET.get('cursor'))
+    if count is None:
+        paginator = Paginator(post_list, settings.NUM_OF_PAGES)
+    else:
+        paginator = CountedPaginator(
+            post_list, settings.NUM_OF_PAGES, count=count
+        )
+    return paginator.get_page(request.GET.get('page'))
+
+
+def get_comments_page(request, post):
+    """Порция комментариев поста, старые сверху, с авторами."""
+    paginator = CursorPaginator(
+        post.comments.select_related('author'),
+        settings.COMMENTS_PER_PAGE,
+        ordering=('created', 'pk'),
+    )
+    return paginator.get_page(request.GET.get('comments'))
+
+
+def feed_cache_context(request, page_obj, scopes):
+    """Параметры тега {% cache %} для списка постов на странице.
+
+    scopes — области fragments, из которых собрана лента.
+    """
+    return {
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+        'feed_cache_version': fragments.feed_version(*scopes),
+        'page_key': (
+            request.GET.get('cursor') or getattr(page_obj, 'number', 1)
+        ),
+    }
@@ -1,49 +1,62 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
 
-from yatube.settings import NUM_OF_PAGES
-
+from . import counters, fragments
+from .conditional import (
+    cache_policy, follow_state, group_state, index_state, post_state,
+    profile_state
+)
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post
+from .search import SearchResults
+from .utils import (
+    feed_cache_context, follow_posts, get_comments_page, get_page_obj
+)
 
 User = get_user_model()
 
 
 # Главная страница
+@cache_policy(index_state, cache_for_guests=True)
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, NUM_OF_PAGES)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.for_feed()
+    page_obj = get_page_obj(request, post_list, counters.posts_count)
     context = {
         'page_obj': page_obj,
+        **feed_cache_context(request, page_obj, [counters.ALL_POSTS]),
     }
     return render(request, 'posts/index.html', context)
 
 
 # Страница с постами, отфильтрованными по группам
+@cache_policy(group_state, cache_for_guests=True)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.group_posts.all()
-    paginator = Paginator(post_list, NUM_OF_PAGES)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = group.group_posts.for_feed()
+    page_obj = get_page_obj(
+        request, post_list, lambda: counters.group_posts_count(group)
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
+        **feed_cache_context(
+            request, page_obj, [counters.group_scope(group.pk)]
+        ),
     }
     return render(request, 'posts/group_list.html', context)
 
 
 # Персональная страница пользователя
+@cache_policy(profile_state)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    paginator = Paginator(post_list, NUM_OF_PAGES)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = author.posts.for_feed()
+    page_obj = get_page_obj(
+        request, post_list, lambda: counters.author_posts_count(author)
+    )
     following = False
     if (
         request.user.is_authenticated
@@ -57,26 +70,43 @@ def profile(request, username):
     context = {
         'page_obj': page_obj,
         'author': author,
-        'post_list': post_list,
+        'post_count': counters.author_posts_count(author),
         'following': following,
-        'author_is_user': author_is_user
+        'author_is_user': author_is_user,
+        **feed_cache_context(
+            request, page_obj, [counters.author_scope(author.pk)]
+        ),
     }
     return render(request, 'posts/profile.html', context)
 
 
 # Подробная инфомрмация о посте
+@cache_policy(post_state)
 def post_detail(request, post_id):
-    post = Post.objects.get(pk=post_id)
-    post_count = post.author.posts.all().count()
+    post = Post.objects.select_related('author', 'group').get(pk=post_id)
+    post_count = counters.author_posts_count(post.author)
     form = CommentForm(request.POST or None)
     context = {
         'post': post,
         'post_count': post_count,
-        'form': form
+        'form': form,
+        'comments': get_comments_page(request, post),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+# Следующая порция комментариев поста для подгрузки на странице
+@cache_policy(post_state)
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    context = {
+        'post': post,
+        'comments': get_comments_page(request, post),
+        'lazy': True,
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
 # Создание нового поста
 @login_required
 def post_create(request):
@@ -127,13 +157,17 @@ def add_comment(request, post_id):
 
 # Страница с постами избранных авторов
 @login_required
+@cache_policy(follow_state)
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, NUM_OF_PAGES)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = follow_posts(request.user)
+    page_obj = get_page_obj(
+        request, post_list, lambda: counters.feed_posts_count(request.user)
+    )
     context = {
         'page_obj': page_obj,
+        **feed_cache_context(
+            request, page_obj, fragments.follow_scopes(request.user)
+        ),
     }
     return render(request, 'posts/follow.html', context)
 
@@ -153,3 +187,16 @@ def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username=username)
+
+
+# Поиск по постам и комментариям
+def search(request):
+    query = request.GET.get('q', '').strip()
+    results = SearchResults(query, Post.objects.for_feed())
+    paginator = Paginator(results, settings.NUM_OF_PAGES)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
@@ -30,6 +30,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,12 +62,53 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# Профиль базы данных выбирается переменной окружения YATUBE_DB_PROFILE:
+# 'sqlite' — SQLite с настройками Django по умолчанию (для разработки);
+# 'sqlite-wal' — для сервера: постоянные соединения, журнал WAL, при
+# котором чтение не ждёт записи, ожидание блокировки и прагмы
+# из SQLITE_PRAGMAS (их выполняет core.db при открытии соединения);
+# 'postgres' — PostgreSQL с параметрами из переменных POSTGRES_*,
+# нужен пакет psycopg2. Сравнить профили: manage.py db_benchmark.
+DB_PROFILE = os.environ.get('YATUBE_DB_PROFILE', 'sqlite')
+
+SQLITE_PRAGMAS = {}
+
+if DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'yatube'),
+            'USER': os.environ.get('POSTGRES_USER', 'yatube'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': 60,
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        }
+    }
+
+if DB_PROFILE == 'sqlite-wal':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': 60,
+        # Сколько секунд ждать, пока другой процесс закончит запись
+        'OPTIONS': {'timeout': 20},
+    })
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        # В режиме WAL NORMAL не теряет целостность при сбое питания,
+        # но не вызывает fsync на каждую транзакцию
+        'synchronous': 'NORMAL',
+        # Размер кэша страниц в КиБ (отрицательное значение)
+        'cache_size': -20000,
+        'temp_store': 'MEMORY',
+        'mmap_size': 128 * 1024 * 1024,
     }
-}
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -112,10 +154,134 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загрузки больше этого размера Django пишет во временный файл, а не
+# держит в памяти; фотографии с телефонов почти всегда больше
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+
+# Картинки постов при загрузке (posts.images): файлы больше
+# IMAGE_MAX_UPLOAD_SIZE байт и больше IMAGE_MAX_PIXELS точек
+# отклоняются, остальные уменьшаются до IMAGE_MAX_SIZE точек по большей
+# стороне и перекодируются без EXIF в IMAGE_FORMAT ('JPEG' или 'WEBP',
+# если Pillow собран с libwebp). Прозрачные картинки сохраняются в PNG,
+# GIF — как есть.
+IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+IMAGE_MAX_PIXELS = 50 * 1000 * 1000
+IMAGE_MAX_SIZE = 2048
+IMAGE_FORMAT = 'JPEG'
+IMAGE_QUALITY = 85
+
+# Кэш в файлах SQLite общий для всех процессов и переживает перезапуск.
+# Тесты работают с кэшем в памяти (yatube.settings_test и TEST_RUNNER),
+# чтобы не смешивать данные с рабочими.
+CACHE_DIR = os.getenv('YATUBE_CACHE_DIR', os.path.join(BASE_DIR, 'cache'))
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'default.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
+    },
+    'thumbnails': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'thumbnails.sqlite3'),
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 200000,
+            'MAX_SIZE': 64 * 1024 * 1024,
+        },
+    },
 }
 
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+# Метаданные превью sorl хранятся в отдельном кэше, чтобы их
+# не вытесняли фрагменты страниц
+THUMBNAIL_CACHE = 'thumbnails'
+
 NUM_OF_PAGES = 10
+
+# Комментарии под постом выводятся порциями по курсору (created, id);
+# следующие порции подгружаются с адреса posts:post_comments
+COMMENTS_PER_PAGE = 20
+
+# 'pages' — нумерованные страницы, 'cursor' — листание по курсору
+# (pub_date, id) без COUNT(*) и OFFSET
+POSTS_PAGINATION = 'pages'
+
+# Сколько секунд счётчики постов для паджинатора живут в кэше
+COUNTERS_CACHE_TIMEOUT = 60 * 60
+
+# Сколько секунд хранится закэшированный список постов страницы ленты.
+# Записи постов, комментариев, групп и подписок сбрасывают кэш сразу.
+FEED_CACHE_TIMEOUT = 20
+
+# Сколько секунд браузеры и прокси могут показывать гостям главную
+# и ленты групп без перепроверки; остальные страницы перепроверяются
+# по ETag (posts.conditional.cache_policy)
+HTTP_CACHE_MAX_AGE = 60
+
+# Поисковый индекс: 'auto' — SQLite FTS5, если доступен, иначе запасной
+# индекс в таблице SearchTerm; 'fts5' и 'python' выбирают бэкенд явно
+SEARCH_BACKEND = 'auto'
+# Сколько лучших результатов поиска учитывает админка
+SEARCH_ADMIN_LIMIT = 1000
+
+# Списки постов, комментариев и подписок в админке. Без фильтров число
+# строк берётся из статистики базы, но не меньше точного счёта из кэша на
+# ADMIN_COUNT_CACHE_TIMEOUT секунд; таблицы меньше ADMIN_EXACT_COUNT_LIMIT
+# строк считаются точно. Фильтры по автору, посту и подписчику предлагают
+# не больше ADMIN_FILTER_CHOICES объектов из последних ADMIN_FILTER_SCAN
+# строк таблицы.
+ADMIN_EXACT_COUNT_LIMIT = 10000
+ADMIN_COUNT_CACHE_TIMEOUT = 5 * 60
+ADMIN_FILTER_CHOICES = 20
+ADMIN_FILTER_SCAN = 1000
+
+# Материализованная лента подписок: новые посты раскладываются по лентам
+# подписчиков при публикации. После включения на существующих данных
+# нужно выполнить manage.py rebuild_timelines.
+FOLLOW_TIMELINE = False
+FOLLOW_TIMELINE_LENGTH = 500
+FOLLOW_TIMELINE_BATCH_SIZE = 1000
+
+# Фоновые задачи (core.jobs) выполняет manage.py runworker.
+# TASKS_EAGER = True выполняет их сразу в запросе, без воркера.
+TASKS_EAGER = False
+TASKS_MAX_ATTEMPTS = 3
+TASKS_RETRY_DELAY = 10
+TASKS_LOCK_TIMEOUT = 10 * 60
+
+# Замеры запросов по представлениям (core.instrumentation): SQL-запросы,
+# время базы и шаблонов, попадания в кэш, заголовок Server-Timing.
+# Включаются переменной окружения YATUBE_INSTRUMENTATION=1; если выключены
+# и замеры, и METRICS, middleware не участвует в обработке запросов. Суммы
+# смотрят на странице /stats/requests/ (для персонала) и командой
+# manage.py request_stats.
+INSTRUMENTATION = os.environ.get('YATUBE_INSTRUMENTATION') == '1'
+# Раз во сколько секунд процесс записывает накопленные суммы в кэш
+INSTRUMENTATION_FLUSH_INTERVAL = 5
+if INSTRUMENTATION:
+    TEMPLATES[0]['BACKEND'] = 'core.instrumentation.InstrumentedTemplates'
+
+# Метрики в формате Prometheus на странице /metrics (core.metrics):
+# время ответа по представлениям, SQL-запросы, соединения с базой,
+# созданные объекты и попадания в кэши. Включаются переменной окружения
+# YATUBE_METRICS=1; запросы замеряет middleware core.instrumentation.
+# Доступ к /metrics стоит закрыть на прокси.
+METRICS = os.environ.get('YATUBE_METRICS') == '1'
+# Общий файл, в котором воркеры складывают свои приращения; None — каждый
+# процесс отдаёт только свои метрики (достаточно для runserver)
+METRICS_FILE = os.path.join(CACHE_DIR, 'metrics.sqlite3')
+# Раз во сколько секунд процесс переносит приращения в METRICS_FILE
+METRICS_FLUSH_INTERVAL = 5
+
+# Размеры превью картинок постов, которые выводят шаблоны: геометрия и
+# параметры тега {% thumbnail %}. Превью всех размеров создаются заранее
+# при загрузке картинки и командой manage.py generate_thumbnails.
+THUMBNAIL_GEOMETRIES = (
+    ('1000', {}),
+    ('300x300', {'crop': 'center'}),
+)
@@ -0,0 +1,15 @@
+"""Настройки для тестов: кэши в памяти вместо файлов SQLite.
+
+pytest берёт их из pytest.ini, manage.py test подставляет кэши
+отсюда через core.test_runner.TestRunner.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES
+
+CACHES = {
+    alias: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': alias,
+    }
+    for alias in CACHES
+}
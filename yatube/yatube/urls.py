@@ -3,11 +3,15 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core import views as core_views
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('stats/', include('core.urls', namespace='core')),
+    path('metrics', core_views.prometheus_metrics, name='metrics'),
     path('', include('posts.urls', namespace='posts'))
 ]
 handler404 = 'core.views.page_not_found'